@@ -15,10 +15,10 @@ from dash.exceptions import PreventUpdate
 
 # from dash_extensions.enrich import DashProxy, Output, Input, State, html, dcc, dash_table, ServersideOutput, ServersideOutputTransform, page_container, page_registry, register_page
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
+from wages import metrics
 
 META_TAGS = [
     {
@@ -51,6 +51,8 @@ app = dash.Dash(
     meta_tags=META_TAGS,
 )
 server = app.server
+# per-callback latency/payload metrics at /metrics (the pages and their callbacks are registered by now)
+metrics.instrument(app)
 
 app.title = "UC My Wages - Visualize Salaries of University of California Employees"
 app.index_string = """
@@ -0,0 +1,85 @@
+// Clientside callbacks of the dashboard (see the clientside_callback calls in pages/dashboard.py):
+// presentation changes handled in the browser without a round trip to the server
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.ucmw = Object.assign({}, window.dash_clientside.ucmw, {
+    // applies the figure deltas of update_figures (see wages/figures.py) to the line plots when they changed,
+    // rescales the projected wages to the starting wage, then sets the scale of the real wages y-axis and the
+    // year range of the x-axes
+    update_line_plots: function (deltas, logScale, years, wage, ...figures) {
+        const triggered = window.dash_clientside.callback_context.triggered.map((t) => t.prop_id);
+        if (triggered.includes("figure-deltas.data") && deltas != null) {
+            // only traces that changed travel between the server and the browser
+            figures = figures.map((figure, i) => (deltas[i] == null ? figure : applyFigureDelta(figure, deltas[i])));
+        }
+        // also after new deltas: they may have been projected with the wage before a change that is still
+        // on its way to the server
+        if ((triggered.includes("initial-wage-input.value") || triggered.includes("figure-deltas.data"))
+            && typeof wage === "number" && figures[0] != null) {
+            figures[0] = scaleProjectedWages(figures[0], wage);
+        }
+        // [projected wages, real wages]
+        return figures.map((figure, i) => {
+            if (figure == null) {
+                return window.dash_clientside.no_update;
+            }
+            const layout = {
+                "xaxis.range": [years[0] - 0.5, years[1] + 0.5],
+                "xaxis.autorange": false,
+            };
+            if (i == 1) {
+                layout["yaxis.type"] = logScale ? "log" : "linear";
+            }
+            return applyFigureDelta(figure, { figure: null, clear: [], keep: null, add: [], layout: layout });
+        });
+    },
+
+    years_title: function (years) {
+        return "Years: " + years[0] + "-" + years[1];
+    },
+});
+
+
+function applyFigureDelta(figure, delta) {
+    // new objects for everything that changes: dcc.Graph only redraws when its figure is a new object
+    const base = delta.figure != null ? delta.figure : (figure || {});
+    const data = (base.data || []).slice();
+    for (const index of delta.clear) {
+        data[index] = Object.assign({}, data[index], { x: [], y: [], customdata: [] });
+    }
+    if (delta.keep != null) {
+        data.splice(0, data.length, ...delta.keep.map((index) => data[index]));
+    }
+    data.push(...delta.add);
+
+    const layout = Object.assign({}, base.layout);
+    for (const [path, value] of Object.entries(delta.layout)) {
+        const keys = path.split(".");
+        let node = layout;
+        for (const key of keys.slice(0, -1)) {
+            node[key] = Object.assign({}, node[key]);
+            node = node[key];
+        }
+        node[keys[keys.length - 1]] = value;
+    }
+    return { data: data, layout: layout };
+}
+
+
+function scaleProjectedWages(figure, wage) {
+    // projected wage = cumulative raises (customdata, see wages/projection.py) * starting wage, to 100s like
+    // scale_raises (numpy rounds halves to even)
+    const data = (figure.data || []).map((trace) => {
+        if (trace.customdata == null) {
+            return trace;
+        }
+        const y = Array.from(trace.customdata, (raises) => (raises == null ? null : roundHalfEven((raises * wage) / 100) * 100));
+        return Object.assign({}, trace, { y: y });
+    });
+    return Object.assign({}, figure, { data: data });
+}
+
+
+function roundHalfEven(value) {
+    const rounded = Math.round(value);
+    return rounded - value === 0.5 && rounded % 2 !== 0 ? rounded - 1 : rounded;
+}
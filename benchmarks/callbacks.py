@@ -0,0 +1,218 @@
+# latency and peak memory of the dashboard callbacks at several data scales
+#
+# every scale runs in a fresh interpreter with UCMW_DATA_DIR pointing at a synthetic data folder (generated
+# with benchmarks/synthetic.py when missing). the callbacks are called directly, the way Dash calls them,
+# with their inputs/states passed through json like the browser does.
+#   latency: median and p95 of --repeat calls (the search/query memos are cleared, so every call does its work)
+#   peak: peak of the memory allocated during one call (tracemalloc)
+#
+# usage (from the repo root):
+#   python benchmarks/callbacks.py --rows 100000 1000000 10000000 --work-dir /tmp/ucmw-bench
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_PATH = os.path.split(os.path.dirname(os.path.abspath(__file__)))[0]
+YEARS = [2011, 2023]
+JOBS = ["GSR (Step 3)", "Teaching Assistant (Step 2, Group 1 Campus)", "Professor (II)"]
+
+
+def measure(f, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):  # the callbacks print their timings
+            t0 = time.perf_counter()
+            f()
+            times.append(time.perf_counter() - t0)
+    times.sort()
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        f()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "p50_ms": times[len(times) // 2] * 1000,
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def child(repeat):
+    sys.path.insert(0, REPO_PATH)
+    os.chdir(REPO_PATH)
+    import numpy as np
+    import plotly
+    import dash
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dash.Dash(__name__, use_pages=True, pages_folder="")
+        import pages.dashboard as dashboard
+        import pages.visualizations as visualizations
+    results = {"import": {"p50_ms": (time.perf_counter() - t0) * 1000}}
+    from wages.cache import ServerSideStore
+
+    store_dir = tempfile.mkdtemp()
+
+    def trigger(component_id):
+        context_value.set(
+            AttributeDict(triggered_inputs=[{"prop_id": component_id + ".value", "value": None}])
+        )
+
+    def wire(value):
+        # what Dash sends to and gets back from the browser
+        return json.loads(json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder))
+
+    names = dashboard.df_names[dashboard.DataSchema.NAME]
+    rows_per_name = np.bincount(names.cat.codes.to_numpy(), minlength=len(names.cat.categories))
+    common_name = names.cat.categories[int(np.argmax(rows_per_name))]
+    rng = np.random.default_rng(0)
+    random_names = list(rng.choice(np.asarray(names.cat.categories, dtype=object), 21, replace=False))
+    results["rows"] = len(dashboard.df_names)
+
+    for label, query in [
+        ("full name", common_name),
+        ("last name", common_name.split()[-1]),
+        ("short", common_name[:3]),
+    ]:
+        results["search_names (" + label + ")"] = measure(
+            lambda: dashboard.search_names(1, None, query),
+            repeat,
+            setup=dashboard.ranked_search.cache_clear,
+        )
+    results["search_results_page_changed"] = measure(
+        lambda: dashboard.search_results_page_changed(1, common_name[:3]), repeat
+    )
+
+    for count in [1, 5, 20]:
+        selected = random_names[:count]
+
+        def filter_combined():
+            trigger(dashboard.ids.NAME_ADDED_DROPDOWN)
+            return dashboard.filter_combined_data(selected, JOBS, YEARS)
+
+        def clear_query_and_store():
+            # a new result store (in an empty directory): the query runs and its result is put
+            dashboard.wage_query._run.cache_clear()
+            dashboard.result_store = ServerSideStore(
+                directory=tempfile.mkdtemp(dir=store_dir), namespace=dashboard.result_store.namespace
+            )
+
+        results["filter_combined_data (" + str(count) + " names)"] = measure(
+            filter_combined, repeat, setup=clear_query_and_store
+        )
+        # the same selection again: its result is stored, only the key is computed
+        results["filter_combined_data (" + str(count) + " names, stored)"] = measure(filter_combined, repeat)
+        # the query alone: time and peak memory follow the selected rows, not the size of the tables
+        results["WageQuery.run (" + str(count) + " names, uncached)"] = measure(
+            lambda: dashboard.wage_query.run(selected, JOBS, YEARS),
+            repeat,
+            setup=dashboard.wage_query._run.cache_clear,
+        )
+
+        combined = wire(filter_combined())
+
+        def first_render():
+            trigger("filtered-combined-data")
+            return dashboard.update_figures(combined, "Total Pay", 22900, YEARS, None, None, None)
+
+        results["update_figures (" + str(count) + " names, first)"] = measure(first_render, repeat)
+
+        # add one more name to the figures rendered for `selected`
+        # the traces ledgers and the figure state the browser keeps
+        state = wire(list(first_render()))
+        trigger(dashboard.ids.NAME_ADDED_DROPDOWN)
+        combined_added = wire(
+            dashboard.filter_combined_data(random_names[: count + 1], JOBS, YEARS)
+        )
+
+        def add_name():
+            trigger("filtered-combined-data")
+            return dashboard.update_figures(
+                combined_added, "Total Pay", 22900, YEARS, state[0], state[1], state[3]
+            )
+
+        results["update_figures (" + str(count) + " names, add one)"] = measure(add_name, repeat)
+
+        # switch the compensation type of the figures rendered for `selected` (no query runs)
+        def switch_compensation():
+            trigger("compensation-type-store")
+            return dashboard.update_figures(
+                combined, "Total Pay & Benefits", 22900, YEARS, state[0], state[1], state[3]
+            )
+
+        results["update_figures (" + str(count) + " names, switch type)"] = measure(
+            switch_compensation, repeat
+        )
+
+    results["update_fig_universities"] = measure(
+        lambda: visualizations.update_fig_universities(1, 2, 3), repeat
+    )
+    shutil.rmtree(store_dir)
+    print(json.dumps(results))
+
+
+def run(data_dir, repeat):
+    env = dict(os.environ, UCMW_DATA_DIR=data_dir)
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", "--repeat", str(repeat)],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=REPO_PATH,
+        env=env,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000, 10000000])
+    parser.add_argument("--work-dir", default="/tmp/ucmw-bench", help="where the synthetic data is kept")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--child", action="store_true")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.repeat)
+        return
+
+    import synthetic  # benchmarks/synthetic.py
+
+    for rows in args.rows:
+        data_dir = os.path.join(args.work_dir, str(rows))
+        if not os.path.exists(os.path.join(data_dir, "wage_store", "manifest.json")):
+            synthetic.generate(rows, data_dir)
+
+        results = run(data_dir, args.repeat)
+        print()
+        print("names table: " + str(results.pop("rows")) + " rows (" + data_dir + ")")
+        print("{:<44} {:>10} {:>10} {:>10}".format("callback", "p50 (ms)", "p95 (ms)", "peak (MB)"))
+        for name, result in results.items():
+            print(
+                "{:<44} {:>10.2f} {:>10} {:>10}".format(
+                    name,
+                    result["p50_ms"],
+                    "{:.2f}".format(result["p95_ms"]) if "p95_ms" in result else "",
+                    "{:.2f}".format(result["peak_mb"]) if "peak_mb" in result else "",
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
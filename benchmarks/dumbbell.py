@@ -0,0 +1,74 @@
+# time to build and serialize a dumbbell (lollipop) chart: a trace per row vs the shared builder
+#
+#   per-row:  a go.Scatter per row for its line, plus a marker trace per series (how the lollipop and proposal
+#             charts used to be drawn)
+#   builder:  wages.figures.dumbbell_connectors (all the lines in one trace) + dumbbell_markers
+# build = creating the go.Figure with its traces (plotly validates every trace), json = fig.to_json() (what
+# Dash sends to the browser); the browser's render time grows with the trace count too
+#
+# usage (from the repo root):
+#   python benchmarks/dumbbell.py
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages.figures import dumbbell_connectors, dumbbell_markers
+
+
+def per_row(labels, start, end):
+    fig = go.Figure()
+    for i in range(0, len(labels)):
+        fig.add_trace(
+            go.Scatter(x=[start[i], end[i]], y=[labels[i], labels[i]], hoverinfo="skip", line=dict(width=3))
+        )
+    fig.add_trace(go.Scatter(x=start, y=labels, mode="markers", marker_size=9))
+    fig.add_trace(go.Scatter(x=end, y=labels, mode="markers", marker_size=9))
+    return fig
+
+
+def builder(labels, start, end):
+    fig = go.Figure()
+    fig.add_trace(dumbbell_connectors(labels, start, end, line=dict(width=3)))
+    fig.add_trace(dumbbell_markers(labels, start, marker_size=9))
+    fig.add_trace(dumbbell_markers(labels, end, marker_size=9))
+    return fig
+
+
+def median_time(f, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print("{:>6} {:>10} {:>8} {:>12} {:>12} {:>12}".format("rows", "method", "traces", "build (ms)", "json (ms)", "json (kB)"))
+    for rows in [10, 100, 1000]:
+        labels = ["Employee<br>" + str(i) for i in range(rows)]
+        start = rng.integers(20000, 200000, rows).tolist()
+        end = (np.array(start) * rng.uniform(1, 1.5, rows)).round().tolist()
+        repeat = 20 if rows < 1000 else 5
+        for name, build in [("per-row", per_row), ("builder", builder)]:
+            fig = build(labels, start, end)
+            print(
+                "{:>6} {:>10} {:>8} {:>12.2f} {:>12.2f} {:>12.1f}".format(
+                    rows,
+                    name,
+                    len(fig.data),
+                    median_time(lambda: build(labels, start, end), repeat),
+                    median_time(fig.to_json, repeat),
+                    len(fig.to_json()) / 1000,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
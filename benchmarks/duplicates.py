@@ -0,0 +1,87 @@
+# latency of combining the selected names when (name, year) duplicates are added up at build time
+#
+# for selections of the names with the most source rows (common names), compares
+#   per-request pandas: the de-duplication filter_combined_data used to run on every request
+#                       (duplicated x2, self-merge, groupby-sum, filter, concat, sort), on the raw rows
+#   query:              WageQuery on the aggregated names table, the whole query (no de-duplication left)
+#
+# usage (from the repo root):
+#   python benchmarks/duplicates.py
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import build, store
+from wages.query import WageQuery
+from wages.schema import DataSchema
+
+COMPENSATION_TYPE = DataSchema.TOTAL_PAY
+
+
+def pandas_dedup(df_combined_filtered):
+    # the per-request de-duplication the dashboard used to run
+    duplicated = df_combined_filtered[[DataSchema.YEAR, DataSchema.NAME]].duplicated(keep=False)
+    df_duplicates = df_combined_filtered.loc[duplicated, [COMPENSATION_TYPE, DataSchema.YEAR]]
+    if len(df_duplicates) == 0:
+        return df_combined_filtered
+    df_duplicates = df_duplicates.merge(
+        df_combined_filtered.loc[
+            df_combined_filtered[[DataSchema.YEAR, DataSchema.NAME]].duplicated(keep=False),
+            DataSchema.NAME,
+        ],
+        left_index=True,
+        right_index=True,
+    )
+    df_duplicates = (
+        df_duplicates.groupby([DataSchema.YEAR, DataSchema.NAME])[COMPENSATION_TYPE].sum().reset_index()
+    )
+    df_duplicates = df_duplicates[df_duplicates[COMPENSATION_TYPE] != 0]
+    df_combined_filtered = df_combined_filtered[~duplicated]
+    df_combined_filtered = pd.concat([df_combined_filtered, df_duplicates])
+    return df_combined_filtered.sort_values(by=[DataSchema.NAME, DataSchema.YEAR], ascending=True)
+
+
+def median_time(f, repeat=20):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    df_raw = build.read_source(store.NAME_DATA_PATH)
+    df_raw = df_raw[[COMPENSATION_TYPE, DataSchema.YEAR, DataSchema.NAME]]
+    df_jobs, df_names = store.load_tables()
+    wage_query = WageQuery(df_jobs, df_names)
+
+    common_names = df_raw[DataSchema.NAME].astype(str).value_counts().index
+    print("names: " + str(len(df_raw)) + " source rows -> " + str(len(df_names)) + " aggregated rows")
+    print(
+        "{:>6} {:>10} {:>10} {:>20} {:>12}".format(
+            "names", "raw rows", "agg rows", "per-request pandas", "query (ms)"
+        )
+    )
+    for n in [1, 5, 20, 100]:
+        names = common_names[:n].tolist()
+        df_selected = df_raw[df_raw[DataSchema.NAME].isin(names)]
+        query = wage_query.canonical(names, [], (2011, 2023))
+        print(
+            "{:>6} {:>10} {:>10} {:>20.3f} {:>12.3f}".format(
+                n,
+                len(df_selected),
+                len(WageQuery.for_compensation(wage_query._compute(*query), COMPENSATION_TYPE)),
+                median_time(lambda: pandas_dedup(df_selected)),
+                median_time(lambda: wage_query._compute(*query)),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# time to serve the figures of the Data Viz page, with and without the figure cache (wages/figure_cache.py)
+#
+#   built:   the figure built from the CSVs (pandas, plotly's figure validation) like every callback used to
+#   cached:  the serialized figure from the cache
+# both include what Dash does with the result: encode it to the JSON of the response
+# for each of the 12 universities plots (position x wage type x date) and the proposal plot
+#
+# usage (from the repo root):
+#   python benchmarks/figure_cache.py
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+import dash
+from dash._utils import to_json
+
+
+def median_time(f, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def quiet(f):
+    # the page prints the time it takes to read its CSVs
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return f()
+
+    return call
+
+
+def main():
+    dash.Dash(__name__, use_pages=True, pages_folder="")
+    with contextlib.redirect_stdout(io.StringIO()):
+        from pages import visualizations
+
+    key = visualizations.figure_cache.key()
+    figures = [
+        (
+            "universities {} {} {}".format(radio_value, wage_value, date_value),
+            lambda r=radio_value, w=wage_value, d=date_value: visualizations.universities_figure(r, w, d, key),
+            lambda r=radio_value, w=wage_value, d=date_value: visualizations.update_fig_universities(r, w, d),
+        )
+        for radio_value in (1, 2)
+        for wage_value in (1, 2)
+        for date_value in (1, 2, 3)
+    ]
+    figures.append(
+        ("proposal", visualizations.proposal_figure, lambda: visualizations.update_fig_proposal("fig-proposal"))
+    )
+
+    print("{:<20} {:>12} {:>12} {:>12}".format("figure", "built (ms)", "cached (ms)", "JSON (kB)"))
+    total_built = total_cached = 0
+    for name, build, serve in figures:
+        build, serve = quiet(build), quiet(serve)
+        built = median_time(lambda: to_json(build()), 10)
+        serve()  # fill the cache
+        cached = median_time(lambda: to_json(serve()), 100)
+        total_built += built
+        total_cached += cached
+        print("{:<20} {:>12.2f} {:>12.3f} {:>12.1f}".format(name, built, cached, len(to_json(serve())) / 1000))
+    print("{:<20} {:>12.2f} {:>12.3f}".format("all", total_built, total_cached))
+
+
+if __name__ == "__main__":
+    main()
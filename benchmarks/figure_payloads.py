@@ -0,0 +1,162 @@
+# request/response sizes of update_figures over a session, with figure deltas vs whole figures
+#
+# every step runs filter_combined_data and update_figures like Dash does (inputs/states passed through json)
+# and keeps the figures of the browser by applying the deltas (wages/figures.py).
+#   deltas:        what the callback sends now (the line plots stay in the browser, only changes come back)
+#   whole figures: what sending the three figures as State and returning them in full would cost for the
+#                  same figures (the protocol before figure deltas)
+# sizes are of the json of the callback's input/state values (request) and output values (response)
+#
+# sessions:
+#   default   adds --names employees one at a time, then removes them again from the front
+#   --cycles  a long session: --cycles times, adds --names employees (a different set every time) one at a
+#             time and removes them all. reports the traces and size of the line plots kept in the browser
+#             after every cycle, with and without dropping the emptied traces (wages.figures.compact_ledger)
+#
+# usage (from the repo root):
+#   python benchmarks/figure_payloads.py --names 25
+#   python benchmarks/figure_payloads.py --names 5 --cycles 50
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+
+REPO_PATH = os.path.split(os.path.dirname(os.path.abspath(__file__)))[0]
+sys.path.insert(0, REPO_PATH)
+os.chdir(REPO_PATH)
+
+YEARS = [2011, 2023]
+JOBS = ["GSR (Step 3)"]
+COMPENSATION_TYPE = "Total Pay"
+
+
+def size(values):
+    return len(json.dumps(values))
+
+
+class Session:
+    # the browser side of the dashboard: ledgers, figure state and figures, updated step by step
+    def __init__(self, dashboard):
+        self.dashboard = dashboard
+        self.ledgers = [None, None]
+        self.figure_state = None
+        self.figures = [{"layout": {}}, {"layout": {}}, None]  # projected, real, lollipop
+
+    def step(self, selected):
+        # returns the (request, response) sizes with deltas and with whole figures
+        import plotly
+        from dash._callback_context import context_value
+        from dash._utils import AttributeDict
+        from wages.figures import apply_delta
+
+        def trigger(component_id):
+            context_value.set(
+                AttributeDict(triggered_inputs=[{"prop_id": component_id + ".value", "value": None}])
+            )
+
+        def wire(value):
+            return json.loads(json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder))
+
+        dashboard = self.dashboard
+        trigger(dashboard.ids.NAME_ADDED_DROPDOWN)
+        combined = wire(dashboard.filter_combined_data(selected, JOBS, YEARS))
+
+        inputs = [combined, COMPENSATION_TYPE, 22900, YEARS, self.ledgers[0], self.ledgers[1]]
+        whole_request = size(inputs + self.figures)
+        delta_request = size(inputs + [self.figure_state])
+
+        trigger("filtered-combined-data")
+        outputs = wire(list(dashboard.update_figures(*inputs, self.figure_state)))
+        self.ledgers = outputs[:2]
+        self.figure_state = outputs[3]
+        self.figures = [
+            apply_delta(figure, delta) for figure, delta in zip(self.figures[:2], outputs[2])
+        ] + [outputs[4]]
+
+        # + the title update_figures used to return
+        whole_response = size(self.ledgers + self.figures + ["Years: {}-{}".format(*YEARS)])
+        return (delta_request, size(outputs)), (whole_request, whole_response)
+
+    def line_plots(self):
+        # traces and json size of the line plots in the browser
+        return sum(len(figure["data"]) for figure in self.figures[:2]), size(self.figures[:2])
+
+
+def payload_session(dashboard, names):
+    session = Session(dashboard)
+    steps = [names[:k] for k in range(1, len(names) + 1)] + [names[k:] for k in range(1, len(names) + 1)]
+    totals = {"deltas": [0, 0], "whole figures": [0, 0]}
+    print("{:>5} {:>8} {:>14} {:>14} {:>14} {:>14}".format(
+        "step", "names", "delta req", "delta resp", "whole req", "whole resp"
+    ))
+    for step, selected in enumerate(steps):
+        deltas, whole = session.step(selected)
+        for protocol, sizes in [("deltas", deltas), ("whole figures", whole)]:
+            totals[protocol][0] += sizes[0]
+            totals[protocol][1] += sizes[1]
+        print("{:>5} {:>8} {:>14} {:>14} {:>14} {:>14}".format(step, len(selected), *deltas, *whole))
+
+    print()
+    for protocol, (request, response) in totals.items():
+        print("{:<14} session total: {:>10} B sent, {:>10} B received".format(protocol, request, response))
+
+
+def long_session(dashboard, names, cycles):
+    from wages import figures
+
+    max_dead_traces = figures.MAX_DEAD_TRACES
+    per_cycle = len(names) // cycles
+    results = {}
+    for label, max_dead in [("compacting", max_dead_traces), ("no compaction", float("inf"))]:
+        figures.MAX_DEAD_TRACES = max_dead
+        session = Session(dashboard)
+        rows = []
+        for cycle in range(cycles):
+            selected = names[cycle * per_cycle : (cycle + 1) * per_cycle]
+            largest_request = 0
+            for k in range(1, per_cycle + 1):
+                largest_request = max(largest_request, session.step(selected[:k])[0][0])
+            session.step([])
+            rows.append(session.line_plots() + (largest_request,))
+        results[label] = rows
+    figures.MAX_DEAD_TRACES = max_dead_traces
+
+    print("{} cycles of adding {} names one at a time and removing them".format(cycles, per_cycle))
+    print("{:>6} | {:^34} | {:^34}".format("", "compacting", "no compaction"))
+    print("{:>6} | {:>8} {:>12} {:>12} | {:>8} {:>12} {:>12}".format(
+        "cycle", "traces", "figures (B)", "max req (B)", "traces", "figures (B)", "max req (B)"
+    ))
+    for cycle, (compacting, uncompacted) in enumerate(zip(results["compacting"], results["no compaction"])):
+        if cycle < 5 or cycle % 10 == 9 or cycle == cycles - 1:
+            print("{:>6} | {:>8} {:>12} {:>12} | {:>8} {:>12} {:>12}".format(
+                cycle + 1, *compacting, *uncompacted
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--names", type=int, default=25, help="names per session (per cycle with --cycles)")
+    parser.add_argument("--cycles", type=int, default=0, help="run the long add/remove session")
+    args = parser.parse_args()
+
+    import numpy as np
+    import dash
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        dash.Dash(__name__, use_pages=True, pages_folder="")
+        import pages.dashboard as dashboard
+
+    categories = dashboard.df_names[dashboard.DataSchema.NAME].cat.categories
+    rng = np.random.default_rng(0)
+    count = args.names * max(args.cycles, 1)
+    names = list(rng.choice(np.asarray(categories, dtype=object), count, replace=False))
+    if args.cycles:
+        long_session(dashboard, names, args.cycles)
+    else:
+        payload_session(dashboard, names)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# time to find the starting compensation of a position/employee in a year (update_initial_wage_input)
+#
+#   masks:       two boolean masks over the table, the builtin sum() over the result and .loc (how the
+#                callback used to find the pay of a position)
+#   PayLookup:   wages/lookup.py, the row from the name's year bitmask
+# for positions (df_jobs) and employees (df_names, what the masks would cost for an employee as the anchor)
+#
+# usage (from the repo root):
+#   python benchmarks/pay_lookup.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import store
+from wages.query import WageQuery
+from wages.schema import DataSchema
+
+YEAR = 2015
+
+
+def masks(df, label):
+    logical_array = (df[DataSchema.YEAR] == YEAR) & (df[DataSchema.NAME] == label)
+    if sum(logical_array) == 1:
+        return df.loc[logical_array, DataSchema.TOTAL_PAY].iloc[0]
+    return None
+
+
+def median_time(f, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    df_jobs, df_names = store.load_tables()
+    query = WageQuery(df_jobs, df_names)
+
+    print("{:>10} {:>10} {:>14} {:>16}".format("table", "rows", "masks (ms)", "PayLookup (ms)"))
+    for table, df, lookup in [("positions", df_jobs, query.job_pay), ("employees", df_names, query.name_pay)]:
+        label = df[DataSchema.NAME].iloc[len(df) // 2]
+        repeat = 20 if len(df) < 1000000 else 3
+        print(
+            "{:>10} {:>10} {:>14.3f} {:>16.4f}".format(
+                table,
+                len(df),
+                median_time(lambda: masks(df, label), repeat),
+                median_time(lambda: lookup.pay_at(label, YEAR, DataSchema.TOTAL_PAY), 1000),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
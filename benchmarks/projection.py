@@ -0,0 +1,91 @@
+# time to project the wages of many names at once
+#
+#   per-name pandas: the loop update_figures used to run for every name added to the projected wages plot
+#                    (shift, cumprod of a Series, round)
+#   project_wages:   wages/projection.py, all the names in one numpy pass
+#   raise index:     the cumulative raises from the raise index of the wage store (raises_from_index) and scaled
+#                    to the starting wage, what update_figures does now
+# over the rows of the first/most common names of the wage store (like adding that many names/positions)
+#
+# usage (from the repo root):
+#   python benchmarks/projection.py
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import store
+from wages.index import RowRangeIndex
+from wages.projection import project_wages, raises_from_index, scale_raises
+from wages.schema import DataSchema, RAISE_INDEX_COLUMNS
+
+INITIAL_WAGE = 22900
+
+
+def per_name(index, codes, years, pay):
+    projected = []
+    for code in codes:
+        start, stop = index.range(code)
+        name_pay = pay[start:stop]
+        priorpay = pd.Series(name_pay).shift(1).to_numpy()
+        priorpay[0] = name_pay[0]
+        adjustment = (name_pay - priorpay) / priorpay + 1
+        projected.append(round(pd.Series(adjustment).cumprod() * INITIAL_WAGE, -2))
+    return projected
+
+
+def vectorized(index, codes, years, pay):
+    rows = index.rows(codes)
+    offsets = np.concatenate([[0], np.cumsum(np.diff(index.offsets)[codes])])
+    return project_wages(offsets, years[rows], pay[rows], INITIAL_WAGE)
+
+
+def from_index(index, codes, raise_index):
+    rows = index.rows(codes)
+    offsets = np.concatenate([[0], np.cumsum(np.diff(index.offsets)[codes])])
+    return scale_raises(raises_from_index(offsets, raise_index[rows]), INITIAL_WAGE)
+
+
+def median_time(f, repeat=20):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t0)
+    return np.median(times) * 1000
+
+
+def main():
+    _, df_names = store.load_tables()
+    index = RowRangeIndex(df_names[DataSchema.NAME].cat.codes.to_numpy(), df_names[DataSchema.NAME].cat.categories)
+    years = df_names[DataSchema.YEAR].to_numpy()
+    pay = df_names[DataSchema.TOTAL_PAY].to_numpy().astype(np.int64)
+    raise_index = df_names[RAISE_INDEX_COLUMNS[DataSchema.TOTAL_PAY]].to_numpy()
+    # the names with the most years
+    codes_by_rows = np.argsort(-np.diff(index.offsets), kind="stable")
+
+    print(
+        "{:>6} {:>8} {:>22} {:>22} {:>22}".format(
+            "names", "rows", "per-name pandas (ms)", "project_wages (ms)", "raise index (ms)"
+        )
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for count in [1, 10, 100, 1000]:
+            codes = np.sort(codes_by_rows[:count])
+            print(
+                "{:>6} {:>8} {:>22.3f} {:>22.3f} {:>22.3f}".format(
+                    count,
+                    len(index.rows(codes)),
+                    median_time(lambda: per_name(index, codes, years, pay)),
+                    median_time(lambda: vectorized(index, codes, years, pay)),
+                    median_time(lambda: from_index(index, codes, raise_index)),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# employee name search latency: str.contains over every row of df_names (the original search_names) vs the
+# trigram index over the unique names (wages/search.py)
+#
+# queries are drawn from the names themselves: full names, last names, short fragments and misses.
+# the fuzzy index (the fallback when nothing matches literally) is measured on full names with their words
+# reversed and one character dropped, e.g. "pradeep b khosla" -> "khsla b pradeep"; recall is the share of
+# queries that list the original name
+#
+# usage (from the repo root):
+#   python benchmarks/search.py [--queries 500]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import store
+from wages.schema import DataSchema
+from wages.search import FuzzyIndex, TrigramIndex
+
+
+def make_queries(names, count, seed=0):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for name in rng.choice(names, count):
+        kind = rng.integers(4)
+        if kind == 0:
+            queries.append(name)  # full name
+        elif kind == 1:
+            queries.append(name.split(" ")[-1])  # last name
+        elif kind == 2:
+            start = rng.integers(max(1, len(name) - 4))
+            queries.append(name[start : start + 4])  # fragment
+        else:
+            queries.append(name[::-1])  # (almost always) a miss
+    return queries
+
+
+def make_fuzzy_queries(names, count, seed=0):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for name in rng.choice(names, count):
+        tokens = name.split(" ")[::-1]
+        i = rng.integers(len(tokens[0]))
+        tokens[0] = tokens[0][:i] + tokens[0][i + 1 :]
+        queries.append((" ".join(tokens), name))
+    return queries
+
+
+def percentiles(latencies):
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    df_jobs, df_names = store.load_tables()
+    names = df_names[DataSchema.NAME].cat.categories
+
+    t0 = time.perf_counter()
+    name_index = TrigramIndex(names)
+    build_time = time.perf_counter() - t0
+
+    queries = make_queries(np.asarray(names, dtype=object), args.queries)
+
+    scan_latencies = []
+    index_latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        df_names_match = df_names[
+            df_names.loc[:, DataSchema.NAME].str.contains(query, regex=False)
+        ]
+        scan_names = set(df_names_match[DataSchema.NAME])
+        scan_latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        index_names = name_index.names[name_index.search(query)]
+        index_latencies.append(time.perf_counter() - t0)
+
+        assert scan_names == set(index_names), query
+
+    print(
+        "rows: {}, unique names: {}, trigrams: {}, index build: {:.3f} s".format(
+            len(df_names), len(names), len(name_index.keys), build_time
+        )
+    )
+    print("{:<10} {:>10} {:>10}".format("search", "p50 (ms)", "p99 (ms)"))
+    for label, latencies in [("scan", scan_latencies), ("trigram", index_latencies)]:
+        print("{:<10} {:>10.3f} {:>10.3f}".format(label, *percentiles(latencies)))
+
+    t0 = time.perf_counter()
+    fuzzy_index = FuzzyIndex(names)
+    build_time = time.perf_counter() - t0
+    fuzzy_latencies = []
+    found = 0
+    for query, name in make_fuzzy_queries(np.asarray(names, dtype=object), args.queries):
+        t0 = time.perf_counter()
+        fuzzy_names = fuzzy_index.names[fuzzy_index.search(query, limit=50)]
+        fuzzy_latencies.append(time.perf_counter() - t0)
+        found += name in set(fuzzy_names)
+
+    print(
+        "fuzzy: tokens: {}, index build: {:.3f} s, recall: {:.3f}".format(
+            len(fuzzy_index.tokens), build_time, found / args.queries
+        )
+    )
+    print("{:<10} {:>10.3f} {:>10.3f}".format("fuzzy", *percentiles(fuzzy_latencies)))
+
+
+if __name__ == "__main__":
+    main()
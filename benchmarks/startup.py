@@ -0,0 +1,186 @@
+# startup time and memory of loading the salary tables, parquet vs the memory-mapped wage store, and the boot
+# time of a worker (importing the app) with and without the startup snapshot (see wages/snapshot.py)
+#
+# each mode is measured in a fresh interpreter. RssAnon is the memory private to the process,
+# RssFile is file-backed memory that the page cache shares between processes (e.g. gunicorn workers)
+# worker boot: off = UCMW_SNAPSHOT=off (everything derived at import), cold = no snapshot yet (derived and
+# saved), warm = the snapshot of the previous start is loaded
+# Data Viz page: importing pages/visualizations.py (what every worker pays) and its first use (reading its
+# data and building its figures, done by the first request of the page since they are built lazily)
+#
+# usage (from the repo root):
+#   python -m wages.build                 # compile the wage store first
+#   python benchmarks/startup.py [--repeat 5]
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_PATH = os.path.split(os.path.dirname(os.path.abspath(__file__)))[0]
+
+
+def read_status():
+    # memory counters of the current process in MB
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                status[key] = int(value.split()[0]) / 1024
+    return status
+
+
+def child(storage):
+    sys.path.insert(0, REPO_PATH)
+    import pandas as pd  # noqa: F401 (keep the pandas import out of the measurement)
+
+    before = read_status()
+    t0 = time.perf_counter()
+    from wages import store
+
+    df_jobs, df_names = store.load_tables(storage)
+    load_time = time.perf_counter() - t0
+
+    # touch every pay value like the first requests would
+    t0 = time.perf_counter()
+    df_names["Total Pay"].sum()
+    df_names["Total Pay & Benefits"].sum()
+    touch_time = time.perf_counter() - t0
+
+    after = read_status()
+    result = {
+        "storage": storage,
+        "rows": len(df_names),
+        "load_s": load_time,
+        "touch_s": touch_time,
+    }
+    for key in after:
+        result[key] = after[key] - before.get(key, 0)
+    print(json.dumps(result))
+
+
+def boot_child():
+    sys.path.insert(0, REPO_PATH)
+    import contextlib
+    import io
+
+    before = read_status()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app  # noqa: F401
+    result = {"boot_s": time.perf_counter() - t0}
+    after = read_status()
+    for key in after:
+        result[key] = after[key] - before.get(key, 0)
+    print(json.dumps(result))
+
+
+def pages_child():
+    sys.path.insert(0, REPO_PATH)
+    import contextlib
+    import io
+
+    import dash
+    import dash_bootstrap_components  # noqa: F401
+    import plotly.graph_objects  # noqa: F401
+    import pandas  # noqa: F401 (the dashboard imports the same libraries)
+
+    dash.Dash(__name__, use_pages=True, pages_folder="")
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        from pages import visualizations
+
+        import_time = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        visualizations.update_fig_proposal("fig-proposal")
+        visualizations.update_fig_universities(1, 2, 3)
+        first_use_time = time.perf_counter() - t0
+    print(json.dumps({"import_s": import_time, "first_use_s": first_use_time}))
+
+
+def run(storage, env=None):
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", storage],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=REPO_PATH,
+        env=env,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def boot_times(repeat):
+    # (mode, best result) of importing the app with the snapshot off, cold and warm
+    snapshot_dir = tempfile.mkdtemp(prefix="ucmw-snapshot-")
+    env = dict(os.environ, UCMW_SNAPSHOT_DIR=snapshot_dir)
+    try:
+        results = [("off", [run("app", dict(env, UCMW_SNAPSHOT="off")) for _ in range(repeat)])]
+        cold = []
+        for _ in range(repeat):
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            cold.append(run("app", env))
+        results.append(("cold", cold))
+        results.append(("warm", [run("app", env) for _ in range(repeat)]))
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    return [(mode, min(runs, key=lambda r: r["boot_s"])) for mode, runs in results]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", default=None)
+    args = parser.parse_args()
+
+    if args.child == "app":
+        boot_child()
+        return
+    if args.child == "pages":
+        pages_child()
+        return
+    if args.child is not None:
+        child(args.child)
+        return
+
+    print(
+        "{:<8} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "storage", "rows", "load (s)", "touch (s)", "RSS (MB)", "anon (MB)", "file (MB)"
+        )
+    )
+    for storage in ["parquet", "store"]:
+        results = [run(storage) for _ in range(args.repeat)]
+        best = min(results, key=lambda r: r["load_s"])
+        print(
+            "{:<8} {:>10} {:>10.4f} {:>10.4f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                storage,
+                best["rows"],
+                best["load_s"],
+                best["touch_s"],
+                best["VmRSS"],
+                best["RssAnon"],
+                best["RssFile"],
+            )
+        )
+
+    print()
+    print("{:<8} {:>10} {:>10} {:>10} {:>10}".format("snapshot", "boot (s)", "RSS (MB)", "anon (MB)", "file (MB)"))
+    for mode, best in boot_times(args.repeat):
+        print(
+            "{:<8} {:>10.3f} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                mode, best["boot_s"], best["VmRSS"], best["RssAnon"], best["RssFile"]
+            )
+        )
+
+    print()
+    print("{:<8} {:>10} {:>14}".format("page", "import (s)", "first use (s)"))
+    best = min([run("pages") for _ in range(args.repeat)], key=lambda r: r["import_s"])
+    print("{:<8} {:>10.4f} {:>14.4f}".format("data viz", best["import_s"], best["first_use_s"]))
+
+
+if __name__ == "__main__":
+    main()
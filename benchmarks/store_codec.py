@@ -0,0 +1,82 @@
+# payload size and encode/decode time of the dcc.Store codecs (wages/codec.py)
+#
+# frames measured:
+#   ledger-N: the traces-in-real-wages ledger with N traces (what update_figures stores every update)
+#   combined: the combined data of N names and the default positions (what filtered-combined-data held
+#             before it moved server-side)
+# size is the length of the json text Dash sends for the store. "auto" is the default: json for frames below
+# COLUMNS_MIN_ROWS rows, where the columns codec is larger than json, columns from there on
+#
+# usage (from the repo root):
+#   python benchmarks/store_codec.py
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import store
+from wages.codec import CODECS, decode_frame, encode_frame
+from wages.query import WageQuery
+from wages.schema import DataSchema
+
+JOBS = ["GSR (Step 3)", "Teaching Associate (Step 4, Group 1 Campus)", "Professor (II)"]
+
+
+def ledger(names):
+    return pd.DataFrame({DataSchema.NAME: names, "Index": np.arange(len(names))}).astype(
+        {DataSchema.NAME: "category", "Index": int}
+    )
+
+
+def measure(df, codec, repeat=50):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        payload = encode_frame(df, codec)
+    encode_time = (time.perf_counter() - t0) / repeat
+    size = len(json.dumps(payload))
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        decode_frame(payload)
+    decode_time = (time.perf_counter() - t0) / repeat
+    return size, encode_time * 1000, decode_time * 1000
+
+
+def main():
+    df_jobs, df_names = store.load_tables()
+    wage_query = WageQuery(df_jobs, df_names)
+    rng = np.random.default_rng(0)
+    all_names = np.asarray(df_names[DataSchema.NAME].cat.categories, dtype=object)
+
+    frames = []
+    for n in [5, 20, 40, 100]:
+        names = list(rng.choice(all_names, n, replace=False))
+        frames.append(("ledger-" + str(n), ledger(names)))
+        frames.append(
+            ("combined-" + str(n), wage_query.run(names, JOBS, (2011, 2023)))
+        )
+
+    print(
+        "{:<14} {:<8} {:>10} {:>10} {:>12} {:>12}".format(
+            "frame", "codec", "bytes", "vs json", "encode (ms)", "decode (ms)"
+        )
+    )
+    for label, df in frames:
+        json_size = None
+        for codec in list(CODECS) + ["auto"]:
+            size, encode_time, decode_time = measure(df, codec)
+            json_size = json_size or size
+            print(
+                "{:<14} {:<8} {:>10} {:>10.2f} {:>12.3f} {:>12.3f}".format(
+                    label, codec, size, size / json_size, encode_time, decode_time
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# synthetic salary tables for benchmarking at any scale
+#
+# writes a data folder in the app's layout (salaries_by_name.parquet, salaries_by_job.parquet and the compiled
+# wage_store) that the app and the other benchmarks use through UCMW_DATA_DIR.
+#
+# names table: employees with careers of a few consecutive years and pay growing 2-5% a year. first and last
+# names are drawn from Zipf distributions, so common names collide like in the real data (several employees
+# with one name in the same year). every employee also gets a Zipf-distributed job title ("Job Title", which
+# the app does not read).
+# jobs table: the positions of assets/salaries_by_job.parquet plus --extra-jobs synthetic positions with a
+# pay for every year
+#
+# usage (from the repo root):
+#   python benchmarks/synthetic.py --rows 1000000 --out /tmp/ucmw-1m
+#   UCMW_DATA_DIR=/tmp/ucmw-1m python app.py
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import build, store
+from wages.schema import DataSchema, MAX_YEAR, MIN_YEAR
+
+SYLLABLES = [
+    "an", "ba", "ca", "da", "el", "fa", "ga", "ha", "in", "ja", "ka", "la", "ma", "na", "on", "pa",
+    "ra", "sa", "ta", "ul", "va", "wa", "ya", "za", "ber", "chen", "dro", "gon", "kos", "lin", "mor",
+    "nez", "pol", "ric", "son", "tor", "van", "wei", "xi", "yu",
+]  # fmt: skip
+JOB_TITLES = [
+    "Professor", "Lecturer", "Staff Research Associate", "Administrative Officer", "Nurse",
+    "Clinical Lab Scientist", "Programmer Analyst", "Custodian", "Student Assistant", "Postdoc",
+]  # fmt: skip
+
+
+def make_words(rng, count, min_syllables, max_syllables):
+    # count distinct pronounceable words made of random syllables
+    words = set()
+    syllables = np.array(SYLLABLES, dtype=object)
+    while len(words) < count:
+        lengths = rng.integers(min_syllables, max_syllables + 1, count)
+        for length in lengths:
+            words.add("".join(rng.choice(syllables, length)))
+    return np.array(sorted(words)[:count], dtype=object)
+
+
+def zipf_choice(rng, values, size, a):
+    # values drawn with Zipf-distributed ranks (the first values are the most common)
+    ranks = rng.zipf(a, size) - 1
+    ranks = np.where(ranks < len(values), ranks, rng.integers(0, len(values), size))
+    return values[rng.permutation(len(values))][ranks]
+
+
+def make_names_table(rng, rows, zipf_a=1.05):
+    # careers of 1-13 years (geometric, cut at the last year), starting in any year
+    people = max(1, rows // 2)
+    start = rng.integers(MIN_YEAR, MAX_YEAR + 1, people)
+    length = np.minimum(rng.geometric(0.25, people), MAX_YEAR + 1 - start)
+    # trim the last careers to hit the requested row count
+    ends = np.cumsum(length)
+    people = min(people, int(np.searchsorted(ends, rows)) + 1)
+    start, length = start[:people], length[:people]
+    length[-1] -= max(0, int(length.sum()) - rows)
+
+    first_names = zipf_choice(rng, make_words(rng, 3000, 2, 3), people, zipf_a)
+    last_names = zipf_choice(rng, make_words(rng, 30000, 2, 4), people, zipf_a)
+    initials = np.array(list("abcdefghijklmnopqrstuvwxyz") + [""] * 26, dtype=object)
+    middle = rng.choice(initials, people)
+    names = np.where(
+        middle == "", first_names + " " + last_names, first_names + " " + middle + " " + last_names
+    )
+    titles = zipf_choice(rng, np.array(JOB_TITLES, dtype=object), people, 1.5)
+
+    # one row per person and year of their career
+    person = np.repeat(np.arange(people), length)
+    offset = np.arange(len(person)) - np.repeat(np.cumsum(length) - length, length)
+    base_pay = rng.lognormal(np.log(60000), 0.7, people)
+    raise_rate = rng.uniform(1.02, 1.05, people)
+    pay = base_pay[person] * raise_rate[person] ** offset
+    pay = np.clip(pay * rng.uniform(0.9, 1.1, len(person)), 100, 655000)
+
+    # the original format: pay divided by 100 as uint16
+    return pd.DataFrame(
+        {
+            DataSchema.NAME: pd.Categorical(names[person]),
+            DataSchema.TOTAL_PAY: (pay / 100).round().astype("uint16"),
+            DataSchema.TOTAL_PAY_AND_BENEFITS: np.minimum(pay * 1.3 / 100, 65535).round().astype("uint16"),
+            DataSchema.YEAR: (start[person] + offset).astype("uint16"),
+            DataSchema.JOB: pd.Categorical(titles[person]),
+        }
+    )
+
+
+def make_jobs_table(rng, extra_jobs):
+    columns = [DataSchema.NAME, DataSchema.TOTAL_PAY, DataSchema.TOTAL_PAY_AND_BENEFITS, DataSchema.YEAR]
+    df_jobs = pd.read_parquet(os.path.join(store.APP_PATH, "assets", "salaries_by_job.parquet"))[columns]
+    df_jobs = df_jobs.dropna(subset=columns)
+
+    years = np.arange(MIN_YEAR, MAX_YEAR + 1)
+    titles = [
+        title + " (Step " + str(step) + ")"
+        for title in make_words(rng, max(1, extra_jobs // 5 + 1), 2, 3)
+        for step in range(1, 6)
+    ][:extra_jobs]
+    base_pay = rng.lognormal(np.log(50000), 0.5, len(titles))
+    pay = np.outer(base_pay, 1.03 ** np.arange(len(years))).ravel()
+    df_extra = pd.DataFrame(
+        {
+            DataSchema.NAME: np.repeat(np.array(titles, dtype=object), len(years)),
+            DataSchema.TOTAL_PAY: (pay / 100).round().astype("uint16"),
+            DataSchema.TOTAL_PAY_AND_BENEFITS: (pay * 1.3 / 100).round().astype("uint16"),
+            DataSchema.YEAR: np.tile(years, len(titles)).astype("float64"),
+        }
+    )
+    return pd.concat([df_jobs, df_extra], ignore_index=True)
+
+
+def generate(rows, out_dir, extra_jobs=50, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    names_path = os.path.join(out_dir, "salaries_by_name.parquet")
+    jobs_path = os.path.join(out_dir, "salaries_by_job.parquet")
+
+    t0 = time.time()
+    df_names = make_names_table(rng, rows)
+    df_names.to_parquet(names_path, engine="fastparquet")
+    make_jobs_table(rng, extra_jobs).to_parquet(jobs_path, engine="fastparquet")
+    print("generated " + str(len(df_names)) + " rows: " + str(time.time() - t0))
+
+    build.build([names_path], [jobs_path], os.path.join(out_dir, "wage_store"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate a synthetic salary data folder")
+    parser.add_argument("--rows", type=int, default=1000000, help="rows of the names table")
+    parser.add_argument("--out", required=True, help="data folder to write (use with UCMW_DATA_DIR)")
+    parser.add_argument("--extra-jobs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.rows, args.out, args.extra_jobs, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# unique memory per gunicorn worker with and without preload (see gunicorn.conf.py)
+#
+# starts `gunicorn app:server` with --workers N (UCMW_PRELOAD=1 and 0), sends every worker some traffic (the
+# page layout, name searches and queries, through the Dash callback endpoint like the browser does) and reads
+# /proc/<pid>/smaps_rollup of the master and every worker:
+#   USS   memory private to the process (Private_Clean + Private_Dirty): what every additional worker costs
+#   PSS   the process' share of all its memory (shared pages divided between the processes mapping them)
+# the totals are over the master and the workers
+#
+# usage (from the repo root):
+#   python benchmarks/worker_memory.py --workers 4 8 16 [--data-dir /tmp/ucmw-bench/100000]
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPO_PATH = os.path.split(os.path.dirname(os.path.abspath(__file__)))[0]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    with open("/proc/{0}/task/{0}/children".format(pid)) as f:
+        return [int(child) for child in f.read().split()]
+
+
+def memory(pid):
+    # (USS, PSS) in MB
+    values = {}
+    with open("/proc/{}/smaps_rollup".format(pid)) as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Pss", "Private_Clean", "Private_Dirty"):
+                values[key] = int(value.split()[0]) / 1024
+    return values["Private_Clean"] + values["Private_Dirty"], values["Pss"]
+
+
+def request(port, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    req = urllib.request.Request("http://127.0.0.1:{}{}".format(port, path), data=data, headers=headers)
+    with urllib.request.urlopen(req, timeout=60) as response:
+        return response.read()
+
+
+def callback(port, outputs, inputs, state=()):
+    # a POST to the Dash callback endpoint; outputs/inputs/state are (id, property[, value]) tuples
+    body = {
+        "output": "..{}..".format("...".join(id + "." + prop for id, prop in outputs))
+        if len(outputs) > 1
+        else "{}.{}".format(*outputs[0]),
+        "outputs": [{"id": id, "property": prop} for id, prop in outputs]
+        if len(outputs) > 1
+        else {"id": outputs[0][0], "property": outputs[0][1]},
+        "inputs": [{"id": id, "property": prop, "value": value} for id, prop, value in inputs],
+        "changedPropIds": [inputs[0][0] + "." + inputs[0][1]],
+        "state": [{"id": id, "property": prop, "value": value} for id, prop, value in state],
+    }
+    return request(port, "/_dash-update-component", body)
+
+
+def traffic(port, names):
+    request(port, "/_dash-layout")
+    for name in names:
+        callback(
+            port,
+            [("name-search-results-container", "children"), ("name-search-query-store", "data")],
+            [("name-search-button", "n_clicks", 1), ("name-search-input", "n_submit", None)],
+            [("name-search-input", "value", name.split()[-1])],
+        )
+        callback(
+            port,
+            [("filtered-combined-data", "data")],
+            [
+                ("name-added-dropdown", "value", [name]),
+                ("rate-job-dropdown", "value", ["GSR (Step 3)"]),
+                ("year-range-slider", "value", [2011, 2023]),
+            ],
+        )
+
+
+def measure(workers, preload, port, env, names, rounds):
+    env = dict(env, UCMW_PRELOAD="1" if preload else "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers),
+         "--bind", "127.0.0.1:" + str(port), "--timeout", "300", "app:server"],
+        cwd=REPO_PATH,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + 600
+        while True:
+            try:
+                if len(children(server.pid)) == workers:
+                    request(port, "/_dash-layout")
+                    break
+            except OSError:
+                pass
+            if time.time() > deadline or server.poll() is not None:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.5)
+        # gunicorn hands the connections to whichever worker accepts first; enough rounds reach all of them
+        for k in range(rounds * workers):
+            traffic(port, names[k % len(names) : k % len(names) + 1])
+        time.sleep(1)
+        master = memory(server.pid)
+        per_worker = [memory(pid) for pid in children(server.pid)]
+    finally:
+        server.terminate()
+        server.wait()
+    return master, per_worker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--data-dir", default=None, help="UCMW_DATA_DIR of the app (default: assets)")
+    parser.add_argument("--rounds", type=int, default=3, help="traffic rounds per worker")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.data_dir is not None:
+        env["UCMW_DATA_DIR"] = os.path.abspath(args.data_dir)
+        os.environ["UCMW_DATA_DIR"] = env["UCMW_DATA_DIR"]
+    sys.path.insert(0, REPO_PATH)
+    import numpy as np
+    from wages import store
+
+    _, df_names = store.load_tables()
+    categories = np.asarray(df_names["Employee Name"].cat.categories, dtype=object)
+    names = list(np.random.default_rng(0).choice(categories, 64, replace=False))
+    del df_names
+
+    print("{:>8} {:>8} {:>16} {:>14} {:>16} {:>16}".format(
+        "preload", "workers", "USS/worker (MB)", "master (MB)", "total USS (MB)", "total PSS (MB)"
+    ))
+    for workers in args.workers:
+        for preload in [True, False]:
+            master, per_worker = measure(workers, preload, free_port(), env, names, args.rounds)
+            print("{:>8} {:>8} {:>16.1f} {:>14.1f} {:>16.1f} {:>16.1f}".format(
+                "on" if preload else "off",
+                workers,
+                np.mean([uss for uss, _ in per_worker]),
+                master[0],
+                master[0] + sum(uss for uss, _ in per_worker),
+                master[1] + sum(pss for _, pss in per_worker),
+            ))
+
+
+if __name__ == "__main__":
+    main()
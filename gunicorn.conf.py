@@ -0,0 +1,59 @@
+# gunicorn settings, read by `gunicorn app:server` from the repo root
+#
+# preload (UCMW_PRELOAD, on by default): the master imports the app once - the memory-mapped wage store, the
+# categories, the search indexes and summaries built from it, the page layouts - and the workers are forked
+# from it, so they share those pages with the master instead of building a private copy each (worker memory
+# no longer grows with the worker count). before forking, the master freezes the garbage collector's view of
+# everything built so far (gc.freeze): a collection in a worker would otherwise write to the header of every
+# tracked object and copy the shared pages one by one
+# UCMW_PRELOAD=0 imports the app in every worker (e.g. to reload code by restarting the workers alone)
+#
+# metrics (wages/metrics.py): the workers of a deploy write their metrics files to one directory, keyed by the
+# master's pid (<tmp>/ucmw-metrics/<pid>, unless UCMW_METRICS_DIR is set). it is set here, before the app is
+# loaded, and emptied on startup; the directories of earlier deploys whose master is gone are removed
+#
+# workers/bind are gunicorn's own settings (WEB_CONCURRENCY, PORT or the command line)
+# `python benchmarks/worker_memory.py` reports the unique memory per worker with and without preload
+import gc
+import os
+import re
+import shutil
+import tempfile
+
+preload_app = os.environ.get("UCMW_PRELOAD", "1") != "0"
+
+METRICS_ROOT = os.path.join(tempfile.gettempdir(), "ucmw-metrics")
+os.environ.setdefault("UCMW_METRICS_DIR", os.path.join(METRICS_ROOT, str(os.getpid())))
+
+
+def running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # another user's process
+    return True
+
+
+def reset_metrics_dir():
+    # the workers' <pid>.json files only: UCMW_METRICS_DIR may be a directory holding other files
+    metrics_dir = os.environ["UCMW_METRICS_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for entry in os.scandir(metrics_dir):
+        if re.fullmatch(r"\d+\.json(\.tmp)?", entry.name) and entry.is_file(follow_symlinks=False):
+            os.remove(entry.path)
+    if os.path.isdir(METRICS_ROOT):
+        for entry in os.scandir(METRICS_ROOT):
+            if entry.name.isdigit() and entry.is_dir(follow_symlinks=False) and not running(int(entry.name)):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            elif re.fullmatch(r"\d+\.json(\.tmp)?", entry.name):
+                os.remove(entry.path)  # written when all deploys shared METRICS_ROOT
+
+
+def when_ready(server):
+    # runs in the master once the app is loaded (with preload) and before the first worker is forked
+    reset_metrics_dir()
+    if preload_app:
+        gc.collect()
+        gc.freeze()
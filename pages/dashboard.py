@@ -11,37 +11,36 @@ from dash import (
     page_registry,
     register_page,
     callback,
+    clientside_callback,
+    ClientsideFunction,
 )
 from dash.exceptions import PreventUpdate
 
 # from dash_extensions.enrich import DashProxy, Output, Input, State, html, dcc, dash_table, ServersideOutput, ServersideOutputTransform, page_container, page_registry, register_page
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
-import os, pathlib
 import time
+import functools
+
+from wages import store
+from wages.schema import DataSchema
+from wages.search import FuzzyIndex, TrigramIndex
+from wages.index import RowRangeIndex
+from wages.cache import ServerSideStore
+from wages.codec import encode_frame, decode_frame
+from wages import metrics
+from wages.query import WageQuery
+from wages.snapshot import Snapshot
+from wages.summary import year_bits, years_from_mask
+from wages.figures import FigureDelta, compact_ledger, dumbbell_connectors, dumbbell_markers
+from wages.projection import cumulative_raises, raises_from_index, scale_raises
 
 register_page(__name__, path="/", title="UC My Wages - Visualize Salaries of University of California Employees", description="Use our tool to look up the salaries of University of California employees. You can visualize how UC employee wages compare to one another and change from year to year.")
 
-# define paths
-APP_PATH = os.path.split(str(pathlib.Path(__file__).parent.resolve()))[0]
-JOB_DATA_PATH = os.path.join(APP_PATH, "assets", "salaries_by_job.parquet")
-NAME_DATA_PATH = os.path.join(APP_PATH, "assets", "salaries_by_name.parquet")
-
-
-# create schemas so that you don't need to remember the labels when coding
-class DataSchema:
-    NAME = "Employee Name"
-    JOB = "Job Title"
-    JOB_ABBREVIATED = "Abbreviated Job Title"
-    TOTAL_PAY = "Total Pay"
-    TOTAL_PAY_AND_BENEFITS = "Total Pay & Benefits"
-    YEAR = "Year"
-    PRIORPAY = "Prior Year Pay"
-    ADJUSTMENT = "Adjustment"
-    CUMADJUSTMENT = "Cumulative Adjustment"
-    PROJECTEDPAY = "Projected Pay"
+FUZZY_SEARCH_LIMIT = 50  # similar names listed when a search has no literal match
+SEARCH_PAGE_SIZE = 20  # rows of the search results table rendered at a time
 
 
 class ids:
@@ -58,6 +57,9 @@ class ids:
     NAME_SEARCH_BUTTON = "name-search-button"
     NAME_SEARCH_RESULTS_CONTAINER = "name-search-results-container"
     NAME_SEARCH_RESULTS_TABLE = "name-search-results-table"
+    NAME_SEARCH_QUERY_STORE = "name-search-query-store"
+    FIGURE_DELTAS_STORE = "figure-deltas"
+    FIGURE_STATE_STORE = "figure-state"
     NAME_ADD_CONTAINER = "name-add-container"
     NAME_ADDED_DROPDOWN = "name-added-dropdown"
     NAME_ADD_BUTTON = "name-add-button"
@@ -77,31 +79,45 @@ class colors:
 
 
 t0 = time.time()
-print("reading csv 1:")
-# load data
-df_jobs = pd.read_parquet(
-    JOB_DATA_PATH, engine="fastparquet"
-)  # need to create parquet file first
+print("reading data (" + store.STORAGE + "):")
+# load data (compiled by `python -m wages.build`: pay in dollars, Year as int16, rows sorted by name/year)
+df_jobs, df_names = store.load_tables()
 print(time.time() - t0)
 
+print("rows: {} names, {} jobs".format(len(df_names), len(df_jobs)))
 
 t0 = time.time()
-print("reading csv 2:")
-df_names = pd.read_parquet(NAME_DATA_PATH, engine="fastparquet")
+print("building name index:")
+# everything below is derived from the tables alone: it is loaded from the startup snapshot when the snapshot
+# was made from the same data, and built (and saved for the next start) otherwise (see wages/snapshot.py).
+# the categories are the tables' own, the snapshot refers to them instead of holding a copy: the arrays of
+# names the search indexes hold and the categories of the query's row indexes
+name_categories = np.asarray(df_names[DataSchema.NAME].cat.categories, dtype=object)
+snapshot = Snapshot(
+    store.source_hash(),
+    shared={
+        "job names": np.asarray(df_jobs[DataSchema.NAME].cat.categories, dtype=object),
+        "names": name_categories,
+        "job categories": df_jobs[DataSchema.NAME].cat.categories,
+        "name categories": df_names[DataSchema.NAME].cat.categories,
+    },
+)
+# trigram index over the unique names for search_names (position in the index = category code)
+name_index = snapshot.get("name index", lambda: TrigramIndex(name_categories))
+# token index for the fuzzy fallback (names in any order, typos, missing initials)
+fuzzy_name_index = snapshot.get("fuzzy name index", lambda: FuzzyIndex(name_categories))
+# query engine for the plotted data (see wages/query.py); its summary of df_names (year bitmasks per name,
+# see wages/summary.py) also serves the name search
+wage_query = WageQuery(
+    df_jobs,
+    df_names,
+    indexes=snapshot.get("query indexes", lambda: WageQuery.indexes(df_jobs, df_names)),
+)
+snapshot.save()
 print(time.time() - t0)
 
-print("size of df_names_filtered:")
-print(df_names.info(memory_usage="deep"))
-
 t0 = time.time()
 
-cat_type_year = pd.api.types.CategoricalDtype(
-    categories=[2011, 2012, 2013, 2014, 2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023],
-    ordered=True,
-)
-df_jobs["Year"] = df_jobs["Year"].astype(cat_type_year)
-df_names["Year"] = df_names["Year"].astype(cat_type_year)
-
 # t0 = time.time()
 print("creating html components:")
 # ------------- create html components --------------------
@@ -126,6 +142,34 @@ job_container = html.Div(
     ]
 )
 
+# the filtered data stays on the server; filtered-combined-data only holds its key and the query. the keys
+# are hashes of the query, in the namespace of the data and code of the snapshot (see wages/cache.py)
+result_store = ServerSideStore(namespace=snapshot.key + snapshot.code)
+metrics.REGISTRY.register_counters(
+    lambda: {
+        "ucmw_result_store_hits_total": result_store.hits,
+        "ucmw_result_store_disk_hits_total": result_store.disk_hits,
+        "ucmw_result_store_misses_total": result_store.misses,
+        "ucmw_result_store_bytes_saved_total": result_store.bytes_saved,
+    }
+)
+
+
+def load_result(data):
+    with metrics.phase("decode"):
+        df = result_store.get(data["key"])
+    if df is None:
+        # expired/evicted (or stored by a worker with another cache dir): the query is memoized anyway
+        df = wage_query.run(*data["query"])
+    return df
+
+
+def encode_traces(df_traces):
+    # the traces ledgers go back to the browser in traces-in-real-wages/traces-in-projected-wages
+    with metrics.phase("encode"):
+        return encode_frame(df_traces)
+
+
 # TODO: implement cola
 # cola_container = html.Div(
 #     className='dropdown-container',
@@ -445,8 +489,6 @@ layout = html.Div(
                     id="content-div",
                     children=[
                         # data stores
-                        dcc.Store(id="filtered-names-data"),
-                        dcc.Store(id="filtered-jobs-data"),
                         dcc.Store(id="filtered-combined-data"),
                         dcc.Store(id="jobs-data"),
                         dcc.Store(id="names-data"),
@@ -454,6 +496,9 @@ layout = html.Div(
                         dcc.Store(id="traces-in-real-wages"),
                         dcc.Store(id="traces-in-projected-wages"),
                         dcc.Store(id="compensation-type-store"),
+                        dcc.Store(id=ids.NAME_SEARCH_QUERY_STORE),
+                        dcc.Store(id=ids.FIGURE_DELTAS_STORE),
+                        dcc.Store(id=ids.FIGURE_STATE_STORE),
                         dcc.Interval(
                             id="page-load-interval",
                             n_intervals=0,
@@ -503,7 +548,7 @@ layout = html.Div(
                                 dbc.AccordionItem(
                                     children=[
                                         html.P(
-                                            "Set a starting compensation by selecting a job or entering a custom amount:"
+                                            "Set a starting compensation by selecting a job or an added employee, or entering a custom amount:"
                                         ),
                                         dcc.Dropdown(
                                             id=ids.INITIAL_WAGE_DROPDOWN,
@@ -670,46 +715,54 @@ def toggle_offcanvas(n1, is_open):
     return is_open
 
 
+# # ------------- search results ----------------
+@functools.lru_cache(maxsize=128)
+def ranked_search(query):
+    # codes of the names matching query, best first, and whether they come from the fuzzy fallback.
+    # memoized so paging through the results of a search does not search again
+    codes = name_index.ranked(query)
+    if len(codes) == 0:
+        # no literal match: try the names with the same words in any order/with typos, best first
+        return fuzzy_name_index.search(query, limit=FUZZY_SEARCH_LIMIT), True
+    return codes, False
+
+
+def search_results_page(query, page):
+    # table records of one page of the results; only the names on the page are looked up
+    codes, _ = ranked_search(query)
+    codes = codes[page * SEARCH_PAGE_SIZE : (page + 1) * SEARCH_PAGE_SIZE]
+
+    # build df where each row is a unique employee w/ an employee name col and a years available col
+    # (the years come from the year bitmasks of the name summary; names are listed once per year)
+    years_masks = wage_query.name_summary.all_years[codes]
+    table_data_records_list = []
+    for mask, name in zip(years_masks, name_index.names[codes]):
+        years_available_str = ", ".join([str(x) for x in years_from_mask(mask)])
+        table_data_records_list.append(
+            {DataSchema.NAME: name, "Years Available": years_available_str}
+        )
+    return table_data_records_list
+
+
 # # ------------- callback - search names in data frame ----------------
 @callback(
     Output(ids.NAME_SEARCH_RESULTS_CONTAINER, "children"),
+    Output(ids.NAME_SEARCH_QUERY_STORE, "data"),
     Input(ids.NAME_SEARCH_BUTTON, "n_clicks"),
     Input(ids.NAME_SEARCH_INPUT, "n_submit"),
     State(ids.NAME_SEARCH_INPUT, "value"),
     prevent_initial_call=True,
 )
 def search_names(n_clicks, n_submit, search_name):
-    print("entered search_names:")
-    print(search_name)
-    t0 = time.time()
     # handle if names is empty
     if (search_name is None) or (df_names is None):
         raise PreventUpdate
-    # handle if no matches (maybe no need)
 
-    # display unique matches
-    df_names_match = df_names[
-        df_names.loc[:, DataSchema.NAME].str.contains(
-            search_name.casefold().strip(), regex=False
-        )
-    ]
-    print("pandas str contains:")
-    print(time.time() - t0)
-
-    t0 = time.time()
-    unique_names_match = list(set(df_names_match[DataSchema.NAME]))
+    # substring match on the unique names through the trigram index (fuzzy match if there is none)
+    query = search_name.casefold().strip()
+    codes_match, fuzzy_match = ranked_search(query)
 
-    # early return if no matches/too many (todo: build robust table with navigation)
-    if len(unique_names_match) > 200:
-        too_many_matches = html.Div(
-            children=[
-                html.Label(
-                    "Found too many matching results. Please enter a more specific name."
-                ),
-            ]
-        )
-        return too_many_matches
-    elif len(unique_names_match) == 0:
+    if len(codes_match) == 0:
         no_matches = html.Div(
             children=[
                 html.Label(
@@ -719,28 +772,23 @@ def search_names(n_clicks, n_submit, search_name):
             ],
             className = "search-alert-div"          
         )
-        return no_matches
+        return no_matches, query
 
-    # build df where each row is a unique employee w/ an employee name col and a years available col
-    table_data_records_list = []
-    for name in unique_names_match:
-        years_available = (
-            df_names_match[DataSchema.YEAR]
-            .loc[df_names_match[DataSchema.NAME] == name]
-            .to_list()
-        )
-        years_available_str = ", ".join([str(x) for x in years_available])
-        table_data_records_list.append(
-            {DataSchema.NAME: name, "Years Available": years_available_str}
+    if fuzzy_match:
+        results_label = "No exact match. Select a similar name:"
+    elif len(codes_match) == 1:
+        results_label = "Select a name from search results:"
+    else:
+        results_label = (
+            "Found " + str(len(codes_match)) + " matching names. Select a name from search results:"
         )
-    print("rest of the script:")
-    print(time.time() - t0)
 
+    # only the first page is sent; search_results_page_changed serves the others
     name_search_results_container_updated = html.Div(
         children=[
-            html.Label("Select a name from search results:"),
+            html.Label(results_label),
             dash_table.DataTable(
-                data=table_data_records_list,
+                data=search_results_page(query, 0),
                 columns=[
                     {"name": DataSchema.NAME, "id": DataSchema.NAME},
                     {"name": "Years Available", "id": "Years Available"},
@@ -749,10 +797,29 @@ def search_names(n_clicks, n_submit, search_name):
                 selected_cells=[{"column": 0, "row": 0}],
                 id=ids.NAME_SEARCH_RESULTS_TABLE,
                 style_data={"whiteSpace": "normal"},
+                page_action="custom",
+                page_current=0,
+                page_size=SEARCH_PAGE_SIZE,
+                page_count=-(-len(codes_match) // SEARCH_PAGE_SIZE),
             ),
         ]
     )
-    return name_search_results_container_updated
+    return name_search_results_container_updated, query
+
+
+# # ------------- callback - page through the search results ----------------
+# the active cell is cleared: its row would point at a name of the new page
+@callback(
+    Output(ids.NAME_SEARCH_RESULTS_TABLE, "data"),
+    Output(ids.NAME_SEARCH_RESULTS_TABLE, "active_cell"),
+    Input(ids.NAME_SEARCH_RESULTS_TABLE, "page_current"),
+    State(ids.NAME_SEARCH_QUERY_STORE, "data"),
+    prevent_initial_call=True,
+)
+def search_results_page_changed(page_current, query):
+    if (query is None) or (page_current is None):
+        raise PreventUpdate
+    return search_results_page(query, page_current), None
 
 
 # # ------------- callback - add selected name from table to the dropdown ----------------
@@ -799,168 +866,60 @@ def update_initial_wage_input(
         trigger_id == ids.YEAR_RANGE_SLIDER
     ):
         # if callback was triggered by user selecting from the dropdown menu, find the selected initial wage to display in the input field
-        logical_array = (df_jobs[DataSchema.YEAR] == min_year) & (
-            df_jobs[DataSchema.NAME] == dropdown_value
-        )  # need to handle if more than 1 match
-        if sum(logical_array) == 1:
-            input_value = df_jobs.loc[logical_array, COMPENSATION_TYPE].iloc[0]
+        # (the pay of the position or employee in the first year, see wages/lookup.py)
+        pay = wage_query.pay_at(dropdown_value, min_year, COMPENSATION_TYPE)
+        if pay is not None:
+            input_value = pay
         else:
-            input_value = ""  # default value if no string matches
+            # no pay in the first year (many added employees have no row in it): the previous wage is kept and
+            # the dropdown is cleared, as for a wage typed in, so that it does not show an anchor it is not from
+            dropdown_value = ""
 
     elif trigger_id == ids.INITIAL_WAGE_INPUT:
         # if callback was triggered by user editing the input field, set dropdown value to empty
         dropdown_value = ""
         input_value = input_value
 
-    input_value = (
-        input_value * 100
-    )  # this is necessary because the raw files are divided by 100
     initial_wage_title = "Starting Compensation: $" + str(input_value)
     return dropdown_value, input_value, initial_wage_title
 
 
-# ------------- callback - filtered-names-data -----------------
-# triggered (1) when name is added/dropped or (2) year range slider is moved (3) initial creation of data store
-# filters by names detected in dropdown menu and year range
+# # ------------- callback - starting compensation options ----------------
+# the added employees can be picked as the starting compensation too, after the positions
 @callback(
-    Output("filtered-names-data", "data"),
-    Input(ids.NAME_ADDED_DROPDOWN, "value"),
-    # Input("compensation-accordion-item", "title"),  # why?
-    Input("compensation-type-store", "data"),
+    Output(ids.INITIAL_WAGE_DROPDOWN, "options"),
+    Input(ids.NAME_ADDED_DROPDOWN, "options"),
     prevent_initial_call=True,
 )
-def filter_names_data(names, COMPENSATION_TYPE):
-
-    if names is None:
-        raise PreventUpdate
-
-    # IMPORTANT when dealing with categories (cat.remove_unused_categories)
-    if names == []:
-        df_names_filtered = pd.DataFrame(
-            columns=[COMPENSATION_TYPE, DataSchema.YEAR, DataSchema.NAME]
-        )
-    else:
-        logical_array = df_names[DataSchema.NAME].isin(names)
-        df_names_filtered = df_names.loc[
-            logical_array, [COMPENSATION_TYPE, DataSchema.YEAR, DataSchema.NAME]
-        ]
-        # df_names_filtered = df_names_filtered.merge(df_names.loc[(df_names[DataSchema.NAME].isin(names)),DataSchema.NAME].cat.remove_unused_categories(),left_index=True, right_index=True)
-
-    return df_names_filtered.to_json(orient="split")
-
-
-# ------------- callback - filtered-jobs-data -----------------
-# triggered (1) when name is added/dropped or (2) year range slider is moved
-# filters by jobs detected in dropdown menu and year range
-# prevent_initial_call is false because we want this to be updated ast startup
-@callback(
-    Output("filtered-jobs-data", "data"),
-    Input(ids.RATE_JOB_DROPDOWN, "value"),
-    Input(
-        "filtered-names-data", "data"
-    ),  # filtered names data triggers this chained callback
-    State("compensation-type-store", "data"),
-    prevent_initial_call=True,
-)
-def filter_jobs_data(jobs, df_names_filtered, COMPENSATION_TYPE):
-    if jobs is None:
-        raise PreventUpdate
-
-    if df_names_filtered is not None:
-        df_names_filtered = pd.read_json(df_names_filtered, orient="split")
-
-    # IMPORTANT for mem usage when dealing with categories (cat.remove_unused_categories)
-    logical_array = df_jobs[DataSchema.NAME].isin(jobs)
-    df_jobs_filtered = df_jobs.loc[
-        logical_array, [COMPENSATION_TYPE, DataSchema.YEAR, DataSchema.NAME]
-    ]
-    # df_jobs_filtered = df_jobs_filtered.merge(df_jobs.loc[logical_array, DataSchema.NAME].cat.remove_unused_categories(),left_index=True, right_index=True)
-
-    # combine
-    df_jobs_filtered = pd.concat([df_jobs_filtered, df_names_filtered]).astype(
-        {DataSchema.NAME: "category"}
-    )
-
-    return df_jobs_filtered.to_json(orient="split")
+def update_initial_wage_options(name_options):
+    return unique_jobs + [name for name in name_options or [] if name not in unique_jobs]
 
 
 # ------------- callback - filtered-combined-data -----------------
-#
-# combines filtered-jobs-data and filtered-names-data
-# further processing by handling duplicates,
+# triggered on page load (the default positions are plotted) and when (1) a name is added/dropped (2) a
+# position is added/dropped (3) the year range slider is moved
+# thin wrapper around WageQuery, which filters names/jobs by the selection and year range and adds up
+# duplicates (same year and name) in one pass. the result has both compensation types, so a change of
+# compensation type goes straight to update_figures
 @callback(
     Output("filtered-combined-data", "data"),
-    # Output("year-range-accordion-item", "title"),
-    Input("filtered-jobs-data", "data"),
+    Input(ids.NAME_ADDED_DROPDOWN, "value"),
+    Input(ids.RATE_JOB_DROPDOWN, "value"),
     Input(ids.YEAR_RANGE_SLIDER, "value"),
-    State("compensation-type-store", "data"),
-    # State("year-range-accordion-item", "title"),
-    prevent_initial_call=True,
+    prevent_initial_call=False,
 )
-def filter_combined_data(df_jobs_filtered, years, COMPENSATION_TYPE):
-
-    df_jobs_filtered = pd.read_json(df_jobs_filtered, orient="split")
-    min_year = years[0]
-    max_year = years[1]
-
-    trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
-    if trigger_id == ids.YEAR_RANGE_SLIDER:
-        year_range_accordion_title = (
-            "Year Range: " + str(min_year) + "-" + str(max_year)
-        )
-
-    # df_jobs_filtered already contains names data if any
-    df_combined = df_jobs_filtered
-
-    # filter out unused years
-    logical_array = (df_combined[DataSchema.YEAR] >= min_year) & (
-        df_combined[DataSchema.YEAR] <= max_year
-    )
-    df_combined_filtered = df_combined.loc[
-        logical_array, [COMPENSATION_TYPE, DataSchema.YEAR, DataSchema.NAME]
-    ]
-
-    # handle duplicates (same year and name)
-    # TODO: handle "duplicates" with common names
-    df_duplicates = df_combined_filtered.loc[
-        df_combined_filtered[[DataSchema.YEAR, DataSchema.NAME]].duplicated(keep=False),
-        [COMPENSATION_TYPE, DataSchema.YEAR],
-    ]  # grab all duplicates (names and year)
-    if len(df_duplicates) > 0:
-        df_duplicates = df_duplicates.merge(
-            df_combined_filtered.loc[
-                df_combined_filtered[[DataSchema.YEAR, DataSchema.NAME]].duplicated(keep=False),
-                DataSchema.NAME,
-            ],
-            left_index=True,
-            right_index=True,
-        )
-        df_duplicates = (
-            df_duplicates.groupby([DataSchema.YEAR, DataSchema.NAME])[COMPENSATION_TYPE]
-            .sum()
-            .reset_index()
-        )  # add duplicates together
-        df_duplicates = df_duplicates[
-            df_duplicates[COMPENSATION_TYPE] != 0
-        ]  # drop some rows with no values
-        df_combined_filtered = df_combined_filtered[
-            ~df_combined_filtered[[DataSchema.YEAR, DataSchema.NAME]].duplicated(
-                keep=False
-            )
-        ]  # delete duplciates from dff_combined
-        df_combined_filtered = pd.concat(
-            [df_combined_filtered, df_duplicates]
-        )  # concatenate together
-        df_combined_filtered = df_combined_filtered.sort_values(
-            by=[DataSchema.NAME, DataSchema.YEAR], ascending=True
-        )
-
-    # convert df_combined_filtered[COMPENSATION_TYPE] to uint32 and multiply by 100
-    df_combined_filtered[COMPENSATION_TYPE] = (
-        df_combined_filtered[COMPENSATION_TYPE].astype("uint32") * 100
-    )
+def filter_combined_data(names, jobs, years):
+    if (names is None) or (jobs is None):
+        raise PreventUpdate
 
-    return df_combined_filtered.to_json(orient="split")
+    query = wage_query.canonical(names, jobs, years)
+    key = result_store.refresh(query)
+    if key is None:
+        # the query only runs when its result is not stored yet
+        df_combined_filtered = wage_query.run(*query)
+        with metrics.phase("encode"):
+            key = result_store.put(query, df_combined_filtered)
+    return {"key": key, "query": query}
 
 
 # ----------------- function for resetting figures -----
@@ -1008,7 +967,7 @@ def reset_fig_lollipop():
     return fig_lollipop
 
 
-def reset_figures(real_wages_axis_type):
+def reset_figures():
 
     fig_real_wages = go.Figure()
     fig_projected_wages = go.Figure()
@@ -1049,8 +1008,7 @@ def reset_figures(real_wages_axis_type):
     fig_real_wages.update_layout(
         template=line_template,
         yaxis_title_text="Compensation (USD)",
-        yaxis_type=real_wages_axis_type,
-    ),
+    ),  # the y-axis type (log/linear switch) is set in the browser
     fig_projected_wages.update_layout(
         template=line_template, yaxis_title_text="Your Projected Compensation (USD)"
     )
@@ -1072,76 +1030,60 @@ def reset_figures(real_wages_axis_type):
 
 
 # --------------- function for updating figures --------
-# triggered when (1) filtered-jobs-data/filtered-names-data stores are updated
+# triggered when (1) filtered-combined-data store is updated (2) the compensation type changes
+# a new starting wage does not come here: the projected traces carry their cumulative raises and the browser
+# rescales them (update_line_plots, see wages/projection.py)
 #
 # this callback updates figs only by adding/"removing" traces ("not technically removing, just deleting variables")
 # also maintains a data frame ledger that tracks what names/jobs currently have traces in the figs
+# the line plots are not sent back and forth: the callback returns the changes (see wages/figures.py) and
+# update_line_plots (assets/dashboard_callbacks.js) applies them in the browser. figure-state keeps the years and
+# compensation type the figures were drawn for and how many traces they have
 @callback(
     Output("traces-in-real-wages", "data"),
     Output("traces-in-projected-wages", "data"),
-    Output(ids.PROJECTED_WAGES_LINE_PLOT, "figure"),
-    Output(ids.REAL_WAGES_LINE_PLOT, "figure"),
+    Output(ids.FIGURE_DELTAS_STORE, "data"),
+    Output(ids.FIGURE_STATE_STORE, "data"),
     Output(ids.LOLLIPOP_CHART, "figure"),
-    Output("lollipop-chart-title", "children"),
-    Input(ids.INITIAL_WAGE_INPUT, "value"),
     Input("filtered-combined-data", "data"),
+    Input("compensation-type-store", "data"),
     # Input("refresh-figures-button", "n_clicks"),
-    Input("real-wages-scale-switch", "value"),
+    State(ids.INITIAL_WAGE_INPUT, "value"),
     State(ids.YEAR_RANGE_SLIDER, "value"),
     State("traces-in-real-wages", "data"),
     State("traces-in-projected-wages", "data"),
-    State(ids.PROJECTED_WAGES_LINE_PLOT, "figure"),
-    State(ids.REAL_WAGES_LINE_PLOT, "figure"),
-    State(ids.LOLLIPOP_CHART, "figure"),
-    State("compensation-type-store", "data"),
+    State(ids.FIGURE_STATE_STORE, "data"),
     prevent_initial_call=True,
 )
 def update_figures(
-    initial_wage,
     df_combined_filtered,
+    COMPENSATION_TYPE,
     # n_clicks,
-    real_wages_scale_switch_value,
+    initial_wage,
     years,
     df_traces_in_real_wages,
     df_traces_in_projected_wages,
-    fig_projected_wages,
-    fig_real_wages,
-    fig_lollipop,
-    COMPENSATION_TYPE,
+    figure_state,
 ):
-    t0 = time.time()
-    df_combined_filtered = pd.read_json(df_combined_filtered, orient="split")
+    if (df_combined_filtered is None) or (COMPENSATION_TYPE is None):
+        raise PreventUpdate
 
-    if df_traces_in_real_wages is not None:
-        df_traces_in_real_wages = pd.read_json(df_traces_in_real_wages, orient="split")
+    # the rows and pay of the compensation type out of the query result (see wages/query.py)
+    df_combined_filtered = WageQuery.for_compensation(
+        load_result(df_combined_filtered), COMPENSATION_TYPE
+    )
 
-    if df_traces_in_projected_wages is not None:
-        df_traces_in_projected_wages = pd.read_json(
-            df_traces_in_projected_wages, orient="split"
-        )
+    with metrics.phase("decode"):
+        if df_traces_in_real_wages is not None:
+            df_traces_in_real_wages = decode_frame(df_traces_in_real_wages)
+
+        if df_traces_in_projected_wages is not None:
+            df_traces_in_projected_wages = decode_frame(df_traces_in_projected_wages)
 
     min_year = years[0]
     max_year = years[1]
     trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
 
-    if real_wages_scale_switch_value == True:
-        real_wages_axis_type = "log"  # or linear
-    else:  # default is linear even
-        real_wages_axis_type = "linear"
-
-    # if just the switch is pushed, only need to update the scale and don't do anything else
-    if trigger_id == "real-wages-scale-switch":
-        fig_real_wages["layout"]["yaxis"]["type"] = real_wages_axis_type
-        lollipop_chart_title = title = "Years: " + str(min_year) + "-" + str(max_year)
-        return (
-            df_traces_in_real_wages.to_json(orient="split"),
-            df_traces_in_projected_wages.to_json(orient="split"),
-            fig_projected_wages,
-            fig_real_wages,
-            fig_lollipop,
-            lollipop_chart_title,
-        )
-
     # if no names/positions added, df_combined filtered is empty, so just reset plots:
     if len(df_combined_filtered) == 0:
         (
@@ -1149,60 +1091,47 @@ def update_figures(
             fig_real_wages,
             df_traces_in_projected_wages,
             df_traces_in_real_wages,
-        ) = reset_figures(real_wages_axis_type)
+        ) = reset_figures()
         fig_lollipop = reset_fig_lollipop()
-        lollipop_chart_title = title = "Years: " + str(min_year) + "-" + str(max_year)
         return (
-            df_traces_in_real_wages.to_json(orient="split"),
-            df_traces_in_projected_wages.to_json(orient="split"),
-            fig_projected_wages,
-            fig_real_wages,
+            encode_traces(df_traces_in_real_wages),
+            encode_traces(df_traces_in_projected_wages),
+            [
+                FigureDelta(figure=fig_projected_wages).to_dict(),
+                FigureDelta(figure=fig_real_wages).to_dict(),
+            ],
+            {"years": [min_year, max_year], "compensation": COMPENSATION_TYPE, "projected": 0, "real": 0},
             fig_lollipop,
-            lollipop_chart_title,
         )
 
-    # the innermost if statement should evaluate as true when user moves the year slider or modify input function; if so, resets plots and "ledgers"
-    if fig_real_wages is not None:
-        if fig_real_wages["layout"]["xaxis"]["range"] is not None:
-            current_fig_min_year = -int(
-                -fig_real_wages["layout"]["xaxis"]["range"][0] // 1
-            )  # this rounds up b/c axes min is less than the smallest year
-            current_fig_max_year = int(
-                fig_real_wages["layout"]["xaxis"]["range"][1] // 1
-            )  # this rounds down
-
-            if (
-                (current_fig_min_year != min_year)
-                or (current_fig_max_year != max_year)
-                or (trigger_id == ids.INITIAL_WAGE_INPUT)
-            ):
-                (
-                    fig_projected_wages,
-                    fig_real_wages,
-                    df_traces_in_projected_wages,
-                    df_traces_in_real_wages,
-                ) = reset_figures(real_wages_axis_type)
-                fig_lollipop = reset_fig_lollipop()
-            else:
-                # do not reset real/projected wages figs - build it from dictionaries from their existing state
-                fig_real_wages = go.Figure(fig_real_wages)
-                fig_projected_wages = go.Figure(fig_projected_wages)
-                fig_lollipop = reset_fig_lollipop()
-
-    # the very first invocation of this callback is from updating 'filtered-jobs-data', triggered by the modal closing
+    # group the rows of each name/job so that a name's rows are a slice instead of a mask per name
+    df_combined_filtered, combined_rows = RowRangeIndex.from_frame(
+        df_combined_filtered, DataSchema.NAME
+    )
+
+    # the figures are reset when user moves the year slider or changes the compensation type, and on the very first
+    # invocation of this callback (from updating 'filtered-combined-data', triggered by the modal closing);
+    # otherwise only the changes to their existing state are sent
     if (
-        (df_traces_in_real_wages is None)
+        (figure_state is None)
+        or (df_traces_in_real_wages is None)
         or (df_traces_in_projected_wages is None)
+        or (figure_state["years"] != [min_year, max_year])
+        or (figure_state.get("compensation") != COMPENSATION_TYPE)
         or (trigger_id == "refresh-figures-button")
     ):
-        reset_flag = False
         (
             fig_projected_wages,
             fig_real_wages,
             df_traces_in_projected_wages,
             df_traces_in_real_wages,
-        ) = reset_figures(real_wages_axis_type)
-        fig_lollipop = reset_fig_lollipop()
+        ) = reset_figures()
+        projected_wages_delta = FigureDelta(figure=fig_projected_wages)
+        real_wages_delta = FigureDelta(figure=fig_real_wages)
+    else:
+        projected_wages_delta = FigureDelta(figure_state["projected"])
+        real_wages_delta = FigureDelta(figure_state["real"])
+    fig_lollipop = reset_fig_lollipop()
 
     # for real wages:
     # get names for real_wages figure
@@ -1218,14 +1147,15 @@ def update_figures(
     )
     indexes_2delete_real_wages = df_traces_in_real_wages.loc[logical_array, "Index"]
     for i in indexes_2delete_real_wages:
-        fig_real_wages.data[int(i)][
-            "x"
-        ] = []  # awkward, but can't delete from tuple; can hide/modify inside objects
-        fig_real_wages.data[int(i)]["y"] = []
+        # emptied instead of deleted so that the indices in the ledgers stay valid (see compact_ledger)
+        real_wages_delta.clear_trace(i)
 
     df_traces_in_real_wages = df_traces_in_real_wages.loc[
         ~logical_array, :
     ]  # remove deleted traces from the df "ledger"
+    df_traces_in_real_wages = compact_ledger(
+        df_traces_in_real_wages, real_wages_delta
+    )  # drop the emptied traces once there are too many
 
     # names in wanted but not yet in real wages: add traces
     names_2add_real_wages = list(
@@ -1233,14 +1163,15 @@ def update_figures(
     )
     fig_real_wage_indices = list()
     for name in names_2add_real_wages:
-        logical_array = df_combined_filtered.loc[:, DataSchema.NAME] == name
-        x_var = df_combined_filtered.loc[logical_array, DataSchema.YEAR]
-        y_var = df_combined_filtered.loc[logical_array, COMPENSATION_TYPE]
+        start, stop = combined_rows.range(combined_rows.categories.get_loc(name))
+        x_var = df_combined_filtered[DataSchema.YEAR].iloc[start:stop]
+        y_var = df_combined_filtered[COMPENSATION_TYPE].iloc[start:stop]
 
-        fig_real_wages.add_trace(
-            go.Scatter(x=x_var, y=y_var, name=name, hovertemplate="$%{y}")
+        fig_real_wage_indices.append(
+            real_wages_delta.add_trace(
+                go.Scatter(x=x_var, y=y_var, name=name, hovertemplate="$%{y}")
+            )
         )
-        fig_real_wage_indices.append(len(fig_real_wages.data) - 1)
 
     df_traces_in_real_wages = pd.concat(
         [
@@ -1255,13 +1186,11 @@ def update_figures(
 
     # for projected wages/lollipop:
     # additional filter for names/jobs that do not span the years
-    names_with_min = df_combined_filtered.loc[
-        df_combined_filtered[DataSchema.YEAR] == min_year, DataSchema.NAME
-    ]
-    names_with_max = df_combined_filtered.loc[
-        df_combined_filtered[DataSchema.YEAR] == max_year, DataSchema.NAME
-    ]
-    names_wanted_in_projected_wages = set(names_with_max) & set(names_with_min)
+    # (a name spans the years when the bits of min_year and max_year are both set in its year bitmask)
+    labels_in_real_wages = pd.Index(list(names_wanted_in_real_wages), dtype=object)
+    span_bits = year_bits(min_year, max_year)
+    spans_years = (wage_query.years_mask(labels_in_real_wages, COMPENSATION_TYPE) & span_bits) == span_bits
+    names_wanted_in_projected_wages = set(labels_in_real_wages[spans_years])
     names_already_in_projected_wages = set(
         df_traces_in_projected_wages.loc[:, DataSchema.NAME]
     )
@@ -1277,42 +1206,60 @@ def update_figures(
         logical_array, "Index"
     ]
     for i in indexes_2delete_projected_wages:
-        fig_projected_wages.data[int(i)][
-            "x"
-        ] = []  # awkward, but can't delete from tuple; can hide/modify inside objects
-        fig_projected_wages.data[int(i)]["y"] = []
+        projected_wages_delta.clear_trace(i)
     df_traces_in_projected_wages = df_traces_in_projected_wages.loc[
         ~logical_array, :
     ]  # remove deleted traces from the df "ledger"
+    df_traces_in_projected_wages = compact_ledger(
+        df_traces_in_projected_wages, projected_wages_delta
+    )  # drop the emptied traces once there are too many
 
     # names in wanted but not yet in real wages: add traces
     names_2add_projected_wages = list(
         names_wanted_in_projected_wages.difference(names_already_in_projected_wages)
     )
-    fig_projected_wage_indices = list()
-    for name in names_2add_projected_wages:
-        logical_array = df_combined_filtered.loc[:, DataSchema.NAME] == name
-
-        pay = df_combined_filtered.loc[logical_array, COMPENSATION_TYPE].to_numpy()
-        priorpay = (
-            df_combined_filtered.loc[logical_array, COMPENSATION_TYPE]
-            .shift(1)
-            .to_numpy()
-        )
-        priorpay[0] = pay[0]
-        adjustment = (pay - priorpay) / priorpay + 1
-        cumadjustment = pd.Series(adjustment).cumprod()
+    # project the wages of all the names to add at once (see wages/projection.py)
+    codes_2add_projected_wages = combined_rows.categories.get_indexer(
+        names_2add_projected_wages
+    )
+    rows_2add_projected_wages = combined_rows.rows(codes_2add_projected_wages)
+    offsets_2add_projected_wages = np.concatenate(
+        [[0], np.cumsum(np.diff(combined_rows.offsets)[codes_2add_projected_wages])]
+    )
+    # cumulative raises from the raise index of the wage store; names whose index is not usable (0 pay, undefined
+    # raises) are computed from their pay
+    raises_2add_projected_wages = raises_from_index(
+        offsets_2add_projected_wages,
+        df_combined_filtered[DataSchema.RAISE_INDEX].to_numpy()[rows_2add_projected_wages],
+    )
+    missing = np.isnan(raises_2add_projected_wages)
+    if missing.any():
+        raises_2add_projected_wages[missing] = cumulative_raises(
+            offsets_2add_projected_wages,
+            df_combined_filtered[DataSchema.YEAR].to_numpy()[rows_2add_projected_wages],
+            df_combined_filtered[COMPENSATION_TYPE].to_numpy()[rows_2add_projected_wages],
+        )[missing]
+    projected_wages = scale_raises(raises_2add_projected_wages, initial_wage)
 
-        y_var = round(
-            cumadjustment * initial_wage, -2
-        )  # round to 100s to clean up the hover text
-        x_var = df_combined_filtered.loc[logical_array, DataSchema.YEAR]
+    fig_projected_wage_indices = list()
+    for i, name in enumerate(names_2add_projected_wages):
+        start, stop = combined_rows.range(codes_2add_projected_wages[i])
+        name_rows = slice(offsets_2add_projected_wages[i], offsets_2add_projected_wages[i + 1])
+        y_var = projected_wages[name_rows]
+        x_var = df_combined_filtered[DataSchema.YEAR].iloc[start:stop]
 
         name = "at " + name + " rate"
-        fig_projected_wages.add_trace(
-            go.Scatter(x=x_var, y=y_var, hovertemplate="$%{y}", name=name)
+        fig_projected_wage_indices.append(
+            projected_wages_delta.add_trace(
+                go.Scatter(
+                    x=x_var,
+                    y=y_var,
+                    customdata=raises_2add_projected_wages[name_rows],
+                    hovertemplate="$%{y}",
+                    name=name,
+                )
+            )
         )
-        fig_projected_wage_indices.append(len(fig_projected_wages.data) - 1)
 
     df_traces_in_projected_wages = pd.concat(
         [
@@ -1336,7 +1283,6 @@ def update_figures(
     df_lollipop = df_combined_filtered[
         df_combined_filtered[DataSchema.NAME].isin(names_wanted_in_projected_wages)
     ]  # df lollipop uses the same wanted names as projected wages
-    lollipop_chart_title = title = "Years: " + str(min_year) + "-" + str(max_year)
     if len(df_lollipop) > 0:
         df_lollipop = df_lollipop.pivot(
             index=DataSchema.NAME, columns=DataSchema.YEAR, values=COMPENSATION_TYPE
@@ -1351,22 +1297,21 @@ def update_figures(
             df_lollipop[DataSchema.NAME].str.replace(" ", "<br>", n=1).tolist()
         )  # also add line break the first space to wrap text
 
-        for i in range(0, len(lollipop_x_start)):
-            fig_lollipop.add_trace(
-                go.Scatter(
-                    x=[lollipop_x_start[i], lollipop_x_end[i]],
-                    y=[lollipop_y[i], lollipop_y[i]],
-                    hoverinfo="skip",
-                    line=dict(color=colors.LOLLIPOP_LINE_COLOR, width=3),
-                )
+        # all the lines are one trace (see wages/figures.py)
+        fig_lollipop.add_trace(
+            dumbbell_connectors(
+                lollipop_y,
+                lollipop_x_start,
+                lollipop_x_end,
+                line=dict(color=colors.LOLLIPOP_LINE_COLOR, width=3),
             )
+        )
 
         lollipop_marker_size = 9
         fig_lollipop.add_trace(
-            go.Scatter(
-                x=lollipop_x_start,
-                y=lollipop_y,
-                mode="markers",
+            dumbbell_markers(
+                lollipop_y,
+                lollipop_x_start,
                 marker_symbol="circle",
                 marker_size=lollipop_marker_size,
                 hovertemplate="$%{x}<br>" + str(min_year) + "<extra></extra>",
@@ -1375,10 +1320,9 @@ def update_figures(
         )
 
         fig_lollipop.add_trace(
-            go.Scatter(
-                x=lollipop_x_end,
-                y=lollipop_y,
-                mode="markers",
+            dumbbell_markers(
+                lollipop_y,
+                lollipop_x_end,
                 marker_size=lollipop_marker_size,
                 hovertemplate="$%{x}<br>" + str(max_year) + "<extra></extra>",
                 marker_color=colors.END_MARKER_COLOR,
@@ -1392,12 +1336,41 @@ def update_figures(
                 height=(len(lollipop_y) - 6) * 50
                 + 400  # increase height by 30px for each additional person past 5
             )
-    print("figure update: " + str(time.time() - t0))
     return (
-        df_traces_in_real_wages.to_json(orient="split"),
-        df_traces_in_projected_wages.to_json(orient="split"),
-        fig_projected_wages,
-        fig_real_wages,
+        encode_traces(df_traces_in_real_wages),
+        encode_traces(df_traces_in_projected_wages),
+        [projected_wages_delta.to_dict(), real_wages_delta.to_dict()],
+        {
+            "years": [min_year, max_year],
+            "compensation": COMPENSATION_TYPE,
+            "projected": projected_wages_delta.trace_count,
+            "real": real_wages_delta.trace_count,
+        },
         fig_lollipop,
-        lollipop_chart_title,
     )
+
+
+# ------------- clientside callbacks - presentation only --------------
+# these run in the browser (assets/dashboard_callbacks.js) and never reach the server
+# applies the figure deltas of update_figures to the line plots, rescales the projected wages to the starting
+# wage, then the presentation settings: the scale of the real wages y-axis (log/linear switch) and the x-axes,
+# which span the years of the year range slider
+clientside_callback(
+    ClientsideFunction(namespace="ucmw", function_name="update_line_plots"),
+    Output(ids.PROJECTED_WAGES_LINE_PLOT, "figure"),
+    Output(ids.REAL_WAGES_LINE_PLOT, "figure"),
+    Input(ids.FIGURE_DELTAS_STORE, "data"),
+    Input("real-wages-scale-switch", "value"),
+    Input(ids.YEAR_RANGE_SLIDER, "value"),
+    Input(ids.INITIAL_WAGE_INPUT, "value"),
+    State(ids.PROJECTED_WAGES_LINE_PLOT, "figure"),
+    State(ids.REAL_WAGES_LINE_PLOT, "figure"),
+    prevent_initial_call=True,
+)
+
+# lollipop chart title from the year range slider
+clientside_callback(
+    ClientsideFunction(namespace="ucmw", function_name="years_title"),
+    Output("lollipop-chart-title", "children"),
+    Input(ids.YEAR_RANGE_SLIDER, "value"),
+)
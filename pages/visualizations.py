@@ -13,13 +13,16 @@ from dash import (
     callback,
 )
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import os, pathlib
 import time
+import functools
 import numpy as np
 
+from wages.figures import dumbbell_connectors, dumbbell_markers
+from wages.figure_cache import FigureCache
+
 
 register_page(__name__, path="/dataviz", title="UC My Wages - Data Visualizations", description= "A collection of graphics related the employee compensation at the University of Southern California.")
 
@@ -42,11 +45,23 @@ class colors:
     GRID_LINES_COLOR = "#C5CCCA"
 
 
-##### create universities comparison plot layout
-t0 = time.time()
-print("reading csv 3:")
-df_universities = pd.read_csv(UNIVERSITIES_DATA_PATH)
-df_fmr = pd.read_csv(LIVING_WAGE_DATA_PATH)
+# what the graphs show until their callbacks return the figures
+EMPTY_FIGURE = {
+    "layout": {
+        "paper_bgcolor": colors.PLOT_BACKGROUND_COLOR,
+        "plot_bgcolor": colors.PLOT_BACKGROUND_COLOR,
+    }
+}
+
+
+# the data of the page (three small CSVs) and its figures are built on first use and cached, not at import:
+# a worker that only serves the dashboard never reads them. the layout below only has the components, the
+# figures come from callbacks once the page is shown. figure_cache keeps every figure serialized per control
+# values (12 universities plots and the proposal plot) and is keyed by the contents of the CSVs
+figure_cache = FigureCache(
+    [UNIVERSITIES_DATA_PATH, LIVING_WAGE_DATA_PATH, PROPOSAL_DATA_PATH]
+)
+
 UC_list = [
     "UC Merced",
     "UC Riverside",
@@ -60,7 +75,18 @@ UC_list = [
     "UC San<br>Francisco<br>",
 ]
 UC_list.reverse()
-print(time.time() - t0)
+
+
+##### universities comparison data
+@functools.lru_cache(maxsize=1)
+def university_data(key):
+    # df_universities, df_fmr of the CSVs with the contents key (figure_cache.key())
+    t0 = time.time()
+    print("reading csv 3:")
+    df_universities = pd.read_csv(UNIVERSITIES_DATA_PATH)
+    df_fmr = pd.read_csv(LIVING_WAGE_DATA_PATH)
+    print(time.time() - t0)
+    return df_universities, df_fmr
 
 
 def reset_fig_universities():
@@ -109,8 +135,6 @@ def reset_fig_universities():
     return fig_universities
 
 
-fig_universities = reset_fig_universities()
-
 universities_comparison_div = html.Div(
     [
         html.H4("How does our tentative agreement relate to rent burden?"),
@@ -334,7 +358,7 @@ universities_comparison_div = html.Div(
                         ),
                         html.P(),
                         dcc.Graph(
-                            figure=fig_universities,
+                            figure=EMPTY_FIGURE,
                             config={"displayModeBar": False},
                             id="fig-universities",
                         ),
@@ -392,197 +416,186 @@ universities_comparison_div = html.Div(
 # HUD fair market rent: https://www.huduser.gov/portal/datasets/fmr.html
 
 ##### create proposal plot
-t0 = time.time()
-print("reading csv 4:")
-df_proposal = pd.read_csv(PROPOSAL_DATA_PATH)
-print(time.time() - t0)
-
-
-fig_proposal = go.Figure()
-
-# templates
-proposal_template = go.layout.Template()
-proposal_template.layout = go.Layout(
-    paper_bgcolor=colors.PLOT_BACKGROUND_COLOR,
-    plot_bgcolor=colors.PLOT_BACKGROUND_COLOR,
-    showlegend=True,
-    title_font=dict(family="Arial", size=20),
-    title_x=0,
-    yaxis=dict(
-        linewidth=1,
-        linecolor="black",
-        showgrid=True,
-        gridcolor=colors.GRID_LINES_COLOR,
-        gridwidth=1,
-        automargin=True,
-        showline=False,
-        fixedrange=True,
-    ),
-    xaxis=dict(
-        zeroline=False,
-        rangemode="tozero",
-        title=dict(text="12-Month Base Pay (USD)"),
-        showgrid=True,
-        gridcolor=colors.GRID_LINES_COLOR,
-        gridwidth=1,
-        showline=True,
-        linewidth=1,
-        linecolor="black",
-        fixedrange=True,
-        automargin=True,
-        title_standoff=15,
-    ),
-    margin=dict(autoexpand=True, r=0, t=0, b=40, l=10),
-    dragmode=False,
-)
+def proposal_figure():
+    t0 = time.time()
+    print("reading csv 4:")
+    df_proposal = pd.read_csv(PROPOSAL_DATA_PATH)
+    print(time.time() - t0)
 
-fig_proposal.update_layout(
-    template=proposal_template,
-    legend=dict(yanchor="bottom", y=1.02, xanchor="center", x=0.5, orientation="h"),
-)
 
-t0 = time.time()
+    fig_proposal = go.Figure()
+
+    # templates
+    proposal_template = go.layout.Template()
+    proposal_template.layout = go.Layout(
+        paper_bgcolor=colors.PLOT_BACKGROUND_COLOR,
+        plot_bgcolor=colors.PLOT_BACKGROUND_COLOR,
+        showlegend=True,
+        title_font=dict(family="Arial", size=20),
+        title_x=0,
+        yaxis=dict(
+            linewidth=1,
+            linecolor="black",
+            showgrid=True,
+            gridcolor=colors.GRID_LINES_COLOR,
+            gridwidth=1,
+            automargin=True,
+            showline=False,
+            fixedrange=True,
+        ),
+        xaxis=dict(
+            zeroline=False,
+            rangemode="tozero",
+            title=dict(text="12-Month Base Pay (USD)"),
+            showgrid=True,
+            gridcolor=colors.GRID_LINES_COLOR,
+            gridwidth=1,
+            showline=True,
+            linewidth=1,
+            linecolor="black",
+            fixedrange=True,
+            automargin=True,
+            title_standoff=15,
+        ),
+        margin=dict(autoexpand=True, r=0, t=0, b=40, l=10),
+        dragmode=False,
+    )
+
+    fig_proposal.update_layout(
+        template=proposal_template,
+        legend=dict(yanchor="bottom", y=1.02, xanchor="center", x=0.5, orientation="h"),
+    )
+
+    t0 = time.time()
 
 
-# create the static proposal plot
-df_proposal = df_proposal.iloc[::-1]  # reverses order of df
-proposal_x_current = df_proposal["Current"].tolist()
-proposal_x_uc_dec2 = df_proposal["UC Proposal (Dec 2)"].tolist()
-proposal_x_uc_dec15 = df_proposal["UC Mediated Proposal (Dec 15)"].tolist()
-proposal_x_sru_dec8 = df_proposal["SRU/ASE Proposal (Dec 8)"].tolist()
-proposal_x_sru_nov30 = df_proposal["SRU/ASE Proposal (Nov 30)"].tolist()
-proposal_x_sru_nov14 = df_proposal["SRU/ASE Proposal (Nov 14)"].tolist()
-proposal_y = (
-    df_proposal["Position"].str.replace(" ", "<br>", n=1).tolist()
-)  # also add line break the first space to wrap text
+    # create the static proposal plot
+    df_proposal = df_proposal.iloc[::-1]  # reverses order of df
+    proposal_x_current = df_proposal["Current"].tolist()
+    proposal_x_uc_dec2 = df_proposal["UC Proposal (Dec 2)"].tolist()
+    proposal_x_uc_dec15 = df_proposal["UC Mediated Proposal (Dec 15)"].tolist()
+    proposal_x_sru_dec8 = df_proposal["SRU/ASE Proposal (Dec 8)"].tolist()
+    proposal_x_sru_nov30 = df_proposal["SRU/ASE Proposal (Nov 30)"].tolist()
+    proposal_x_sru_nov14 = df_proposal["SRU/ASE Proposal (Nov 14)"].tolist()
+    proposal_y = (
+        df_proposal["Position"].str.replace(" ", "<br>", n=1).tolist()
+    )  # also add line break the first space to wrap text
 
 
-# colors
-uc_dec2_dot_color = "#6FA7C0"
-uc_dec15_dot_color = "#005581"
-current_dot_color = "#616161"
-sru_dec8_color = "#FF366A"
-sru_nov30_dot_color = "#E1839C"
-sru_nov14_dot_color = "#EAABBC"
+    # colors
+    uc_dec2_dot_color = "#6FA7C0"
+    uc_dec15_dot_color = "#005581"
+    current_dot_color = "#616161"
+    sru_dec8_color = "#FF366A"
+    sru_nov30_dot_color = "#E1839C"
+    sru_nov14_dot_color = "#EAABBC"
 
-proposal_marker_size = 6
+    proposal_marker_size = 6
 
-for i in range(0, len(proposal_x_sru_nov30)):
+    # the lines between the proposals, one trace per line style (see wages/figures.py)
     fig_proposal.add_trace(
-        go.Scatter(
-            showlegend=False,
-            mode="lines",
-            x=[proposal_x_sru_dec8[i], proposal_x_sru_nov14[i]],
-            y=[proposal_y[i], proposal_y[i]],
-            hoverinfo="skip",
+        dumbbell_connectors(
+            proposal_y,
+            proposal_x_sru_dec8,
+            proposal_x_sru_nov14,
             line=dict(color=colors.LOLLIPOP_LINE_COLOR, width=2, dash="dot"),
         )
     )
 
-for i in range(0, len(proposal_x_sru_dec8)):  # this skips the last two missing from uaw
     fig_proposal.add_trace(
-        go.Scatter(
-            showlegend=False,
-            mode="lines",
-            x=[proposal_x_uc_dec15[i], proposal_x_sru_dec8[i]],
-            y=[proposal_y[i], proposal_y[i]],
-            hoverinfo="skip",
+        dumbbell_connectors(
+            proposal_y,
+            proposal_x_uc_dec15,
+            proposal_x_sru_dec8,
             line=dict(color=colors.LOLLIPOP_LINE_COLOR, width=2),
         )
     )
 
-for i in range(0, len(proposal_x_current)):
     fig_proposal.add_trace(
-        go.Scatter(
-            showlegend=False,
-            mode="lines",
-            x=[proposal_x_current[i], proposal_x_uc_dec15[i]],
-            y=[proposal_y[i], proposal_y[i]],
-            hoverinfo="skip",
+        dumbbell_connectors(
+            proposal_y,
+            proposal_x_current,
+            proposal_x_uc_dec15,
             line=dict(color=colors.LOLLIPOP_LINE_COLOR, width=2, dash="dot"),
         )
     )
 
 
-fig_proposal.add_trace(
-    go.Scatter(
-        name="Current Base Pay",
-        x=proposal_x_current,
-        y=proposal_y,
-        mode="markers",
-        marker_symbol="circle",
-        marker_size=proposal_marker_size,
-        hovertemplate="Current:<br>$%{x:,.2f}<extra>%{y}</extra>",
-        marker_color=current_dot_color,
+    fig_proposal.add_trace(
+        dumbbell_markers(
+            proposal_y,
+            proposal_x_current,
+            name="Current Base Pay",
+            marker_symbol="circle",
+            marker_size=proposal_marker_size,
+            hovertemplate="Current:<br>$%{x:,.2f}<extra>%{y}</extra>",
+            marker_color=current_dot_color,
+        )
     )
-)
 
-fig_proposal.add_trace(
-    go.Scatter(
-        name="UC (Dec 2)",
-        x=proposal_x_uc_dec2,
-        y=proposal_y,
-        mode="markers",
-        marker_size=proposal_marker_size,
-        hovertemplate="UC (Dec 2):<br>$%{x:,.2f}<extra>%{y}</extra>",
-        marker_color=uc_dec2_dot_color,
+    fig_proposal.add_trace(
+        dumbbell_markers(
+            proposal_y,
+            proposal_x_uc_dec2,
+            name="UC (Dec 2)",
+            marker_size=proposal_marker_size,
+            hovertemplate="UC (Dec 2):<br>$%{x:,.2f}<extra>%{y}</extra>",
+            marker_color=uc_dec2_dot_color,
+        )
     )
-)
 
-fig_proposal.add_trace(
-    go.Scatter(
-        name="UC Mediated (Dec 15)",
-        x=proposal_x_uc_dec15,
-        y=proposal_y,
-        mode="markers",
-        marker_size=proposal_marker_size,
-        hovertemplate="UC Mediated (Dec 15):<br>$%{x:,.2f}<extra>%{y}</extra>",
-        marker_color=uc_dec15_dot_color,
+    fig_proposal.add_trace(
+        dumbbell_markers(
+            proposal_y,
+            proposal_x_uc_dec15,
+            name="UC Mediated (Dec 15)",
+            marker_size=proposal_marker_size,
+            hovertemplate="UC Mediated (Dec 15):<br>$%{x:,.2f}<extra>%{y}</extra>",
+            marker_color=uc_dec15_dot_color,
+        )
     )
-)
 
-fig_proposal.add_trace(
-    go.Scatter(
-        name="SRU/ASE (Nov 14)",
-        x=proposal_x_sru_nov14,
-        y=proposal_y,
-        mode="markers",
-        marker_size=proposal_marker_size,
-        hovertemplate="SRU/ASE (Nov 14):<br>$%{x:,.2f}<extra>%{y}</extra>",
-        marker_color=sru_nov14_dot_color,
+    fig_proposal.add_trace(
+        dumbbell_markers(
+            proposal_y,
+            proposal_x_sru_nov14,
+            name="SRU/ASE (Nov 14)",
+            marker_size=proposal_marker_size,
+            hovertemplate="SRU/ASE (Nov 14):<br>$%{x:,.2f}<extra>%{y}</extra>",
+            marker_color=sru_nov14_dot_color,
+        )
     )
-)
 
-fig_proposal.add_trace(
-    go.Scatter(
-        name="SRU/ASE (Nov 30)",
-        x=proposal_x_sru_nov30,
-        y=proposal_y,
-        mode="markers",
-        marker_size=proposal_marker_size,
-        hovertemplate="SRU/ASE (Nov 30):<br>$%{x:,.2f}<extra>%{y}</extra>",
-        marker_color=sru_nov30_dot_color,
+    fig_proposal.add_trace(
+        dumbbell_markers(
+            proposal_y,
+            proposal_x_sru_nov30,
+            name="SRU/ASE (Nov 30)",
+            marker_size=proposal_marker_size,
+            hovertemplate="SRU/ASE (Nov 30):<br>$%{x:,.2f}<extra>%{y}</extra>",
+            marker_color=sru_nov30_dot_color,
+        )
     )
-)
 
-fig_proposal.add_trace(
-    go.Scatter(
-        name="SRU/ASE (Dec 8)",
-        x=proposal_x_sru_dec8,
-        y=proposal_y,
-        mode="markers",
-        marker_size=proposal_marker_size,
-        hovertemplate="SRU/ASE (Dec 8):<br>$%{x:,.2f}<extra>%{y}</extra>",
-        marker_color=sru_dec8_color,
+    fig_proposal.add_trace(
+        dumbbell_markers(
+            proposal_y,
+            proposal_x_sru_dec8,
+            name="SRU/ASE (Dec 8)",
+            marker_size=proposal_marker_size,
+            hovertemplate="SRU/ASE (Dec 8):<br>$%{x:,.2f}<extra>%{y}</extra>",
+            marker_color=sru_dec8_color,
+        )
     )
-)
 
-if len(proposal_y) < 6:
-    fig_proposal.update_layout(height=400)
-else:
-    fig_proposal.update_layout(
-        height=(len(proposal_y) - 6) * 50 + 400
-    )  # increase height by 30px for each additional person past 5
+    if len(proposal_y) < 6:
+        fig_proposal.update_layout(height=400)
+    else:
+        fig_proposal.update_layout(
+            height=(len(proposal_y) - 6) * 50 + 400
+        )  # increase height by 30px for each additional person past 5
+
+    return fig_proposal
 
 
 wage_proposal_div = html.Div(
@@ -593,7 +606,11 @@ wage_proposal_div = html.Div(
         dbc.Row(
             [
                 dbc.Col(
-                    dcc.Graph(figure=fig_proposal, config={"displayModeBar": False}),
+                    dcc.Graph(
+                        figure=EMPTY_FIGURE,
+                        config={"displayModeBar": False},
+                        id="fig-proposal",
+                    ),
                     xl=9,
                     lg=12,
                 ),
@@ -633,6 +650,15 @@ layout = html.Div(
 )
 
 
+##### proposal plot (static, built once)
+@callback(
+    Output("fig-proposal", "figure"),
+    Input("fig-proposal", "id"),  # fires once when the page is shown
+)
+def update_fig_proposal(_):
+    return figure_cache.get(("proposal",), lambda key: proposal_figure())
+
+
 ##### create university wage comparison plot
 
 
@@ -644,6 +670,14 @@ layout = html.Div(
     prevent_initial_call=False,
 )
 def update_fig_universities(radio_value, wage_value, date_value):
+    return figure_cache.get(
+        ("universities", radio_value, wage_value, date_value),
+        lambda key: universities_figure(radio_value, wage_value, date_value, key),
+    )
+
+
+def universities_figure(radio_value, wage_value, date_value, key):
+    df_universities, df_fmr = university_data(key)
     fig_universities = reset_fig_universities()
 
     if radio_value == 1:
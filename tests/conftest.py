@@ -0,0 +1,47 @@
+# small salary tables shared by the tests: the raw rows (as read by wages/build.py) and the tables compiled
+# from them, with the cases the app has to handle: (name, year) duplicates, duplicates adding up to 0, rows of
+# 0 pay, gaps between years and a position whose title is also an employee name
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import build
+from wages.schema import DataSchema
+
+NAMES = ["anna lee", "bo wu", "carlos núñez", "dana o'brien", "li", "maria garcia", "pradeep b khosla", "zoë müller"]
+JOBS = ["GSR (Step 3)", "Professor (II)", "maria garcia"]
+
+
+def raw_rows(labels, count, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            DataSchema.NAME: rng.choice(labels, count),
+            DataSchema.YEAR: rng.integers(2011, 2024, count),
+            DataSchema.TOTAL_PAY: rng.integers(0, 200000, count).astype(np.float64),
+        }
+    )
+    df[DataSchema.TOTAL_PAY_AND_BENEFITS] = df[DataSchema.TOTAL_PAY] * 1.3
+    # rows of 0 pay (alone or as duplicates that add up to 0) for one compensation type or both
+    zero = rng.random(count) < 0.15
+    df.loc[zero, DataSchema.TOTAL_PAY] = 0
+    df.loc[zero & (rng.random(count) < 0.5), DataSchema.TOTAL_PAY_AND_BENEFITS] = 0
+    return df
+
+
+@pytest.fixture(scope="session")
+def raw_tables():
+    # raw jobs, raw names
+    return raw_rows(JOBS, 40, seed=1), raw_rows(NAMES, 300, seed=2)
+
+
+@pytest.fixture(scope="session")
+def tables(raw_tables):
+    # df_jobs, df_names as the wage store holds them
+    raw_jobs, raw_names = raw_tables
+    return build.compile_table(raw_jobs, sort_names=False), build.compile_table(raw_names)
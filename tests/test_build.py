@@ -0,0 +1,74 @@
+# aggregation of (name, year) duplicates by the build (wages/build.py)
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import numpy as np
+import pandas as pd
+import pytest
+
+from wages import build, store
+from wages.schema import DataSchema, PAY_COLUMNS
+
+
+def grouped(raw):
+    df = raw.assign(**{column: raw[column].round() for column in PAY_COLUMNS})
+    return (
+        df.groupby([DataSchema.NAME, DataSchema.YEAR])
+        .agg(**{column: (column, "sum") for column in PAY_COLUMNS}, rows=(DataSchema.YEAR, "size"))
+        .reset_index()
+    )
+
+
+def test_compile_table_adds_up_duplicates(raw_tables):
+    raw = raw_tables[1]
+    table = build.compile_table(raw)
+    expected = grouped(raw)
+
+    assert list(table[DataSchema.NAME].astype(str)) == list(expected[DataSchema.NAME])
+    np.testing.assert_array_equal(table[DataSchema.YEAR], expected[DataSchema.YEAR])
+    for column in PAY_COLUMNS:
+        np.testing.assert_array_equal(table[column], expected[column])
+    # every row keeps the number of rows it was added up from
+    np.testing.assert_array_equal(table[DataSchema.SOURCE_ROWS], expected["rows"])
+    assert table[DataSchema.SOURCE_ROWS].sum() == len(raw)
+    assert (table[DataSchema.SOURCE_ROWS] > 1).any()
+
+
+def test_compile_table_breakdown(raw_tables):
+    raw = raw_tables[1]
+    table = build.compile_table(raw, breakdown=True)
+    for column, breakdown_column in zip(PAY_COLUMNS, build.BREAKDOWN_COLUMNS):
+        parts = table[breakdown_column]
+        assert list(parts.map(len)) == list(table[DataSchema.SOURCE_ROWS])
+        assert list(parts.map(sum)) == list(table[column])
+
+
+def test_aggregate_duplicates_overflow():
+    table = pd.DataFrame(
+        {
+            DataSchema.NAME: pd.Categorical(["a", "a"]),
+            DataSchema.TOTAL_PAY: np.array([2**31, 2**31], dtype=np.uint32),
+            DataSchema.TOTAL_PAY_AND_BENEFITS: np.array([1, 1], dtype=np.uint32),
+            DataSchema.YEAR: np.array([2015, 2015], dtype=np.int16),
+        }
+    )
+    with pytest.raises(ValueError):
+        build.aggregate_duplicates(table)
+
+
+def test_build_store_keeps_source_rows(raw_tables, tmp_path):
+    raw_jobs, raw_names = raw_tables
+    paths = {}
+    for name, raw in [("jobs", raw_jobs), ("names", raw_names)]:
+        paths[name] = str(tmp_path / (name + ".csv"))
+        raw[build.COLUMNS].to_csv(paths[name], index=False)
+    out_dir = str(tmp_path / "wage_store")
+    manifest = build.build([paths["names"]], [paths["jobs"]], out_dir=out_dir)
+
+    df_names = store.read_table("names", out_dir)
+    assert manifest["tables"]["names"] == {
+        "rows": len(df_names),
+        "source_rows": len(raw_names),
+        "unique_names": raw_names[DataSchema.NAME].nunique(),
+    }
+    np.testing.assert_array_equal(df_names[DataSchema.SOURCE_ROWS], grouped(raw_names)["rows"])
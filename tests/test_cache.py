@@ -0,0 +1,36 @@
+# server-side store of the query results (wages/cache.py)
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import pandas as pd
+
+from wages.cache import ServerSideStore
+from wages.query import WageQuery
+
+QUERY = WageQuery.canonical(["bo wu", "anna lee"], ["GSR (Step 3)"], (2012, 2020))
+
+
+def test_keys_are_query_hashes(tables, tmp_path):
+    result_store = ServerSideStore(directory=str(tmp_path), namespace="data")
+    assert result_store.refresh(QUERY) is None
+    df = WageQuery(*tables).run(*QUERY)
+    key = result_store.put(QUERY, df)
+    assert key == result_store.key(QUERY) == result_store.key(list(QUERY))  # the query as it comes back as json
+    assert result_store.refresh(QUERY) == key
+    assert result_store.get(key) is df  # a memory hit is neither decoded nor copied
+    assert ServerSideStore(directory=str(tmp_path), namespace="other data").refresh(QUERY) is None
+
+    # another worker sharing the directory
+    worker = ServerSideStore(directory=str(tmp_path), namespace="data")
+    assert worker.refresh(QUERY) == key
+    pd.testing.assert_frame_equal(worker.get(key), df)
+    assert (worker.hits, worker.disk_hits, worker.misses) == (0, 1, 0)
+    assert worker.get("../" + key) is None
+
+
+def test_memory_only(tables):
+    result_store = ServerSideStore(directory=None)
+    df = WageQuery(*tables).run(*QUERY)
+    key = result_store.put(QUERY, df)
+    assert result_store.refresh(QUERY) == key
+    assert result_store.get(key) is df
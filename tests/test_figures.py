@@ -0,0 +1,98 @@
+# incremental figure updates (wages/figures.py)
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import copy
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from conftest import NAMES
+from wages import figures
+from wages.figures import FigureDelta, apply_delta, compact_ledger
+from wages.schema import DataSchema
+
+
+def update(figure, df_traces, wanted):
+    # what update_figures does for one figure: empty the traces of the removed names, compact, add the new names
+    delta = FigureDelta(len(figure["data"]))
+    removed = ~df_traces[DataSchema.NAME].isin(wanted)
+    for index in df_traces.loc[removed, "Index"]:
+        delta.clear_trace(index)
+    df_traces = compact_ledger(df_traces.loc[~removed], delta)
+    added = [name for name in wanted if name not in set(df_traces[DataSchema.NAME])]
+    indices = [delta.add_trace(go.Scatter(x=[2011, 2012], y=[1, 2], name=name)) for name in added]
+    df_traces = pd.concat([df_traces, pd.DataFrame({DataSchema.NAME: added, "Index": indices})]).astype(
+        {DataSchema.NAME: object, "Index": int}
+    )
+    return apply_delta(figure, delta.to_dict()), df_traces, delta
+
+
+def test_compact_ledger_renumbers_the_traces():
+    rng = np.random.default_rng(0)
+    labels = NAMES + ["name " + str(i) for i in range(40)]
+    figure = {"data": []}
+    df_traces = pd.DataFrame({DataSchema.NAME: [], "Index": []}).astype({DataSchema.NAME: object, "Index": int})
+    compacted = 0
+    for _ in range(200):
+        wanted = list(rng.choice(labels, rng.integers(0, 12), replace=False))
+        figure, df_traces, delta = update(figure, df_traces, wanted)
+        compacted += delta.keep is not None
+        data = figure["data"]
+        assert delta.trace_count == len(data)
+        # the ledger points at the trace of every name shown, the other traces are empty
+        assert sorted(df_traces[DataSchema.NAME]) == sorted(wanted)
+        assert [data[index]["name"] for index in df_traces["Index"]] == list(df_traces[DataSchema.NAME])
+        live = set(df_traces["Index"])
+        dead = [trace for index, trace in enumerate(data) if index not in live]
+        assert all(len(trace["x"]) == 0 for trace in dead)
+        # added after compacting, so up to MAX_DEAD_TRACES dead traces plus the ones emptied by this update
+        assert len(dead) <= figures.MAX_DEAD_TRACES + len(delta.clear)
+    assert compacted > 0
+
+
+def test_compact_ledger_keeps_few_dead_traces():
+    delta = FigureDelta(figures.MAX_DEAD_TRACES + 2)
+    df_traces = pd.DataFrame({DataSchema.NAME: ["a", "b"], "Index": [5, 1]})
+    assert compact_ledger(df_traces, delta) is df_traces
+    assert delta.keep is None
+
+    delta = FigureDelta(figures.MAX_DEAD_TRACES + 3)
+    compacted = compact_ledger(df_traces, delta)
+    assert delta.keep == [1, 5] and delta.trace_count == 2
+    assert list(compacted["Index"]) == [1, 0] and list(df_traces["Index"]) == [5, 1]
+
+
+def test_apply_delta():
+    figure = {
+        "data": [{"x": [1], "y": [2], "customdata": [3], "name": "a"}, {"x": [4], "y": [5], "name": "b"}],
+        "layout": {"title": {"text": "t"}},
+    }
+    before = copy.deepcopy(figure)
+    delta = FigureDelta(2)
+    delta.clear_trace(0)
+    assert delta.add_trace(go.Scatter(x=[6], y=[7], name="c")) == 2
+    delta.update_layout("xaxis.range", [2011, 2023])
+    delta.update_layout("title.text", "u")
+    result = apply_delta(figure, delta.to_dict())
+
+    assert figure == before
+    assert [trace["name"] for trace in result["data"]] == ["a", "b", "c"]
+    assert result["data"][0]["x"] == [] and result["data"][0]["customdata"] == []
+    assert result["data"][1] == before["data"][1]
+    assert result["layout"] == {"title": {"text": "u"}, "xaxis": {"range": [2011, 2023]}}
+    assert apply_delta(figure, None) is figure
+
+    # a reset replaces the figure
+    reset = FigureDelta(figure=go.Figure(go.Scatter(x=[1], y=[1], name="d")))
+    assert [trace["name"] for trace in apply_delta(figure, reset.to_dict())["data"]] == ["d"]
+
+    # compacting keeps the traces in the given order, the added ones follow
+    delta = FigureDelta(3)
+    delta.compact([2, 0])
+    delta.add_trace(go.Scatter(x=[], y=[], name="e"))
+    assert [trace["name"] for trace in apply_delta(result, delta.to_dict())["data"]] == ["c", "a", "e"]
+    with pytest.raises(ValueError):
+        delta.compact([0])
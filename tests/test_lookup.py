@@ -0,0 +1,39 @@
+# (label, year) -> pay lookups (wages/lookup.py) against the boolean masks the starting compensation callback
+# used before
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import numpy as np
+
+from conftest import JOBS, NAMES
+from wages.query import WageQuery
+from wages.schema import DataSchema, MIN_YEAR, PAY_COLUMNS
+
+
+def masked(df, label, year, column):
+    pay = df.loc[(df[DataSchema.NAME] == label) & (df[DataSchema.YEAR] == year), column]
+    return None if len(pay) == 0 else pay.iloc[0].item()
+
+
+def test_pay_at_equals_mask(tables):
+    df_jobs, df_names = tables
+    query = WageQuery(df_jobs, df_names)
+    years = range(MIN_YEAR - 1, 2026)
+    for column in PAY_COLUMNS:
+        for lookup, df, labels in [(query.job_pay, df_jobs, JOBS), (query.name_pay, df_names, NAMES)]:
+            for label in labels + ["not a name"]:
+                for year in years:
+                    assert lookup.pay_at(label, year, column) == masked(df, label, year, column), (label, year)
+
+
+def test_pay_at_positions_first(tables):
+    df_jobs, df_names = tables
+    query = WageQuery(df_jobs, df_names)
+    # "maria garcia" is a position and an employee: the position's pay
+    year = int(df_jobs.loc[df_jobs[DataSchema.NAME] == "maria garcia", DataSchema.YEAR].iloc[0])
+    column = DataSchema.TOTAL_PAY
+    assert query.pay_at("maria garcia", year, column) == masked(df_jobs, "maria garcia", year, column)
+    assert query.pay_at("anna lee", year, column) == masked(df_names, "anna lee", year, column)
+    assert query.pay_at(None, year, column) is None
+    assert query.pay_at("", year, column) is None
+    assert np.isscalar(query.pay_at("anna lee", int(df_names[DataSchema.YEAR].iloc[0]), column))
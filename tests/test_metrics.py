@@ -0,0 +1,49 @@
+# callback metrics (wages/metrics.py)
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import dash
+from dash import Input, Output, _callback, html
+
+from wages import metrics
+
+
+def test_instrumented_callbacks_time_the_serialization():
+    app = dash.Dash(__name__)
+    app.layout = html.Div([html.Div(id="in"), html.Div(id="out")])
+
+    @app.callback(Output("out", "children"), Input("in", "children"))
+    def big_output(value):
+        return ["x"] * 1_000_000
+
+    registry = metrics.Registry(directory=None)
+    to_json = _callback.to_json
+    metrics.instrument(app, registry)
+    assert _callback.to_json is to_json  # Dash itself is not patched
+
+    response = app.server.test_client().post(
+        "/_dash-update-component",
+        json={
+            "output": "out.children",
+            "outputs": {"id": "out", "property": "children"},
+            "inputs": [{"id": "in", "property": "children", "value": 1}],
+            "changedPropIds": ["in.children"],
+        },
+    )
+    assert response.status_code == 200
+    seconds = {
+        dict(labels)["phase"]: values[-1]
+        for (name, labels), values in registry.histograms.items()
+        if name == "ucmw_callback_seconds"
+    }
+    # the callback returns at once, Dash serializing its output is most of the call
+    assert seconds["encode"] > seconds["compute"]
+    assert seconds["encode"] <= seconds["total"]
+    assert registry.counters[("ucmw_callback_calls_total", (("callback", "big_output"), ("outcome", "ok")))] == 1
+
+
+def test_with_timed_to_json_leaves_other_functions():
+    def callback():
+        return 1
+
+    assert metrics.with_timed_to_json(callback) is callback
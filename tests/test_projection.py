@@ -0,0 +1,24 @@
+# scale_raises with the values the starting compensation input can hold
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages.projection import scale_raises
+
+
+def test_scale_raises():
+    np.testing.assert_array_equal(scale_raises(np.array([1.0, 1.05, np.nan]), 22900), [22900, 24000, np.nan])
+
+
+@pytest.mark.parametrize("initial_wage", ["", None])
+def test_scale_raises_without_a_wage(initial_wage):
+    # an empty input field: no projected values, the browser scales the raises once a wage is entered
+    np.testing.assert_array_equal(scale_raises(np.array([1.0, 1.05]), initial_wage), [np.nan, np.nan])
+    assert scale_raises(np.zeros(0), initial_wage).shape == (0,)
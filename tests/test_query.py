@@ -0,0 +1,56 @@
+# WageQuery (wages/query.py) against the per-request de-duplication the dashboard used to run on the raw rows
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import JOBS, NAMES
+from wages.query import WageQuery
+from wages.schema import DataSchema, PAY_COLUMNS
+
+
+def baseline(raw_jobs, raw_names, names, jobs, years, compensation_type):
+    # the selected raw rows in the year range, added up per (name, year); a (name, year) of several rows that
+    # adds up to 0 is dropped
+    df = pd.concat([raw_jobs[raw_jobs[DataSchema.NAME].isin(jobs)], raw_names[raw_names[DataSchema.NAME].isin(names)]])
+    df = df[(df[DataSchema.YEAR] >= years[0]) & (df[DataSchema.YEAR] <= years[1])]
+    df = df.assign(pay=df[compensation_type].round())
+    grouped = df.groupby([DataSchema.NAME, DataSchema.YEAR])["pay"].agg(["sum", "size"]).reset_index()
+    grouped = grouped[(grouped["size"] == 1) | (grouped["sum"] != 0)]
+    return grouped.sort_values([DataSchema.NAME, DataSchema.YEAR])
+
+
+def selections():
+    rng = np.random.default_rng(0)
+    yield list(NAMES), list(JOBS), (2011, 2023)
+    yield [], [], (2011, 2023)
+    yield ["maria garcia"], ["maria garcia"], (2011, 2023)  # a job title equal to an employee name
+    yield ["not a name"], ["GSR (Step 3)", "not a job"], (2015, 2018)
+    for _ in range(50):
+        names = list(rng.choice(NAMES, rng.integers(0, 5)))
+        jobs = list(rng.choice(JOBS, rng.integers(0, 3)))
+        start = int(rng.integers(2011, 2024))
+        yield names, jobs, (start, int(rng.integers(start, 2024)))
+
+
+@pytest.mark.parametrize("compensation_type", PAY_COLUMNS)
+def test_query_equals_per_request_dedup(tables, raw_tables, compensation_type):
+    query = WageQuery(*tables)
+    for names, jobs, years in selections():
+        expected = baseline(*raw_tables, names, jobs, years, compensation_type)
+        result = WageQuery.for_compensation(query.run(names, jobs, years), compensation_type)
+        assert list(result[DataSchema.NAME].astype(str)) == list(expected[DataSchema.NAME]), (names, jobs, years)
+        np.testing.assert_array_equal(result[DataSchema.YEAR], expected[DataSchema.YEAR])
+        np.testing.assert_array_equal(result[compensation_type], expected["sum"])
+
+
+def test_query_is_memoized_and_canonical(tables):
+    query = WageQuery(*tables)
+    first = query.run(["bo wu", "anna lee"], ["GSR (Step 3)"], [2012, 2020])
+    second = query.run(["anna lee", "bo wu", "anna lee"], ["GSR (Step 3)"], (2012, 2020))
+    pd.testing.assert_frame_equal(first, second)
+    assert query.cache_info().hits == 1
+    first.iloc[:, 0] = 0  # callers get their own copy
+    pd.testing.assert_frame_equal(query.run(["bo wu", "anna lee"], ["GSR (Step 3)"], [2012, 2020]), second)
@@ -0,0 +1,123 @@
+# name search indexes (wages/search.py)
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.split(os.path.dirname(os.path.abspath(__file__)))[0])
+
+from wages import search
+from wages.search import FuzzyIndex, TrigramIndex
+
+FIRST_NAMES = ["pradeep", "maria", "josé", "zoë", "al", "li", "anna", "björn", "nguyễn", "jo"]
+LAST_NAMES = ["khosla", "garcia", "núñez", "müller", "o'brien", "lee", "smith-jones", "ng", "wu", "kovač"]
+
+
+def random_names(count, seed=0):
+    rng = np.random.default_rng(seed)
+    names = {
+        " ".join(
+            [rng.choice(FIRST_NAMES)]
+            + ([rng.choice(list("abcdefghij"))] if rng.random() < 0.3 else [])
+            + [rng.choice(LAST_NAMES)]
+        )
+        for _ in range(count)
+    }
+    # very short names (no trigram) and single tokens
+    return sorted(names | {"a", "li", "wu", "zoë", "al b"})
+
+
+@pytest.fixture(scope="module")
+def names():
+    return random_names(2000)
+
+
+def substring_queries(names, count, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(count):
+        name = names[rng.integers(len(names))]
+        start = int(rng.integers(len(name)))
+        queries.append(name[start : start + int(rng.integers(1, 9))])
+    return queries
+
+
+def test_trigram_search_equals_str_contains(names):
+    index = TrigramIndex(names)
+    series = pd.Series(names)
+    queries = substring_queries(names, 300) + ["", "x", "zz", "kh", "ë", "ñe", "zzz", "khoslaa", "a b", "ễn", "núñez"]
+    for query in queries:
+        expected = np.flatnonzero(series.str.contains(query, regex=False).to_numpy())
+        np.testing.assert_array_equal(index.search(query), expected, err_msg=repr(query))
+
+
+def test_trigram_ranked(names):
+    index = TrigramIndex(names)
+    ranked = [names[code] for code in index.ranked("li")]
+    assert ranked[0] == "li"
+    starts = [name.startswith("li") for name in ranked[1:]]
+    assert starts == sorted(starts, reverse=True)  # the names starting with the query before the rest
+    assert sorted(ranked) == sorted(names[code] for code in index.search("li"))
+
+
+def test_trigram_index_of_short_names():
+    index = TrigramIndex(["a", "li", "wu"])
+    np.testing.assert_array_equal(index.search("li"), [1])
+    assert len(index.search("lia")) == 0
+
+
+FUZZY_NAMES = [
+    "pradeep b khosla",
+    "pradeep kumar",
+    "maria garcia",
+    "maria j garcia",
+    "mario garcia",
+    "josé núñez",
+    "li wu",
+]
+
+
+def fuzzy(index, query, **kwargs):
+    return [FUZZY_NAMES[code] for code in index.search(query, **kwargs)]
+
+
+def test_fuzzy_token_order():
+    index = FuzzyIndex(FUZZY_NAMES)
+    for query in ["pradeep khosla", "khosla pradeep", "khosla b pradeep", "b khosla pradeep"]:
+        assert fuzzy(index, query) == ["pradeep b khosla"], query
+    # fewest edits first, then fewest name tokens the query did not mention (the initial is optional)
+    assert fuzzy(index, "garcia maria") == ["maria garcia", "maria j garcia", "mario garcia"]
+
+
+def test_fuzzy_typos():
+    index = FuzzyIndex(FUZZY_NAMES)
+    assert fuzzy(index, "pradeep kosla") == ["pradeep b khosla"]  # deletion
+    assert fuzzy(index, "pradep khsola") == ["pradeep b khosla"]  # deletion and transposition
+    assert fuzzy(index, "jose núñez") == ["josé núñez"]  # an accent is a substitution
+    assert fuzzy(index, "jose nunez") == []  # 2 substitutions in a 5-letter token
+    assert fuzzy(index, "garica maria") == ["maria garcia", "maria j garcia", "mario garcia"]
+    assert fuzzy(index, "pradeep kxxxla") == []  # more edits than a 6-letter token allows
+    assert fuzzy(index, "lo wu") == []  # no typos in tokens of 2 letters
+
+
+def test_fuzzy_time_budget():
+    index = FuzzyIndex(FUZZY_NAMES)
+    # past the budget the query tokens are only matched exactly
+    assert fuzzy(index, "pradeep khosla", time_budget=0) == ["pradeep b khosla"]
+    assert fuzzy(index, "pradeep kosla", time_budget=0) == []
+    ids, distances = index.token_matches("garcia", 2, deadline=0)
+    assert list(index.tokens[ids]) == ["garcia"] and list(distances) == [0]
+
+
+def test_fuzzy_candidates_are_capped(monkeypatch):
+    names = ["ab" + chr(0x100 + i) + "cd" for i in range(100)] + ["abcd"]
+    index = FuzzyIndex(names)
+    assert len(index.token_matches("abcd", 1)[0]) == search.FUZZY_MAX_TOKEN_MATCHES
+    monkeypatch.setattr(search, "FUZZY_MAX_CANDIDATES", 10)
+    ids, distances = index.token_matches("abcd", 1)
+    assert len(ids) == 10 and index.tokens[ids[0]] == "abcd"
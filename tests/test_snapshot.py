@@ -0,0 +1,31 @@
+# startup snapshot (wages/snapshot.py)
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import numpy as np
+
+from wages.query import WageQuery
+from wages.schema import DataSchema
+from wages.snapshot import Snapshot
+
+
+def test_snapshot_refers_to_the_tables_categories(tables, tmp_path):
+    df_jobs, df_names = tables
+    shared = {
+        "job categories": df_jobs[DataSchema.NAME].cat.categories,
+        "name categories": df_names[DataSchema.NAME].cat.categories,
+    }
+    snapshot = Snapshot("data", shared=shared, directory=str(tmp_path), enabled=True)
+    built = snapshot.get("query indexes", lambda: WageQuery.indexes(df_jobs, df_names))
+    snapshot.save()
+
+    loaded = Snapshot("data", shared=shared, directory=str(tmp_path), enabled=True)
+    assert list(loaded.objects) == ["query indexes"]
+    job_rows, name_rows, job_summary, name_summary = loaded.get("query indexes", None)
+    assert job_rows.categories is shared["job categories"]
+    assert name_rows.categories is shared["name categories"]
+    np.testing.assert_array_equal(name_rows.offsets, built[1].offsets)
+    np.testing.assert_array_equal(name_summary.all_years, built[3].all_years)
+
+    # other data: rebuilt
+    assert Snapshot("other data", shared=shared, directory=str(tmp_path), enabled=True).objects == {}
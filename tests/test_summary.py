@@ -0,0 +1,65 @@
+# year bitmasks of the per-name summary (wages/summary.py) against the years in the table
+#
+# usage (from the repo root):
+#   python -m pytest tests
+import pandas as pd
+import pytest
+
+from wages.index import RowRangeIndex
+from wages.schema import DataSchema, MIN_YEAR, PAY_COLUMNS
+from wages.summary import YEAR_BITS, WageSummary, year_bits, years_from_mask
+
+
+def summarize(df):
+    index = RowRangeIndex(df[DataSchema.NAME].cat.codes.to_numpy(), df[DataSchema.NAME].cat.categories)
+    return index, WageSummary(df, index)
+
+
+def test_year_bits_roundtrip():
+    assert year_bits() == 0
+    assert year_bits(MIN_YEAR) == 1
+    assert year_bits(MIN_YEAR, MIN_YEAR + 2, MIN_YEAR + 2) == 0b101
+    for years in [(), (MIN_YEAR,), (2013, 2014, 2020), tuple(range(MIN_YEAR, MIN_YEAR + YEAR_BITS))]:
+        assert years_from_mask(year_bits(*years)) == years
+
+
+@pytest.mark.parametrize("table", [0, 1])
+def test_summary_years(tables, table):
+    df = tables[table]
+    index, summary = summarize(df)
+    assert len(summary) == len(index.categories)
+    for code, label in enumerate(index.categories):
+        rows = df[df[DataSchema.NAME] == label]
+        assert years_from_mask(summary.all_years[code]) == tuple(rows[DataSchema.YEAR]), label
+        for column in PAY_COLUMNS:
+            # a row that adds up several source rows to 0 is not plotted
+            plotted = rows[(rows[DataSchema.SOURCE_ROWS] == 1) | (rows[column] != 0)]
+            assert years_from_mask(summary.years[column][code]) == tuple(plotted[DataSchema.YEAR]), label
+
+
+def test_summary_of_names_without_rows():
+    df = pd.DataFrame(
+        {
+            DataSchema.NAME: pd.Categorical(["b", "b"], categories=["a", "b", "c"]),
+            DataSchema.YEAR: [2012, 2015],
+            DataSchema.SOURCE_ROWS: [1, 2],
+            **{column: [10, 0] for column in PAY_COLUMNS},
+        }
+    )
+    summary = summarize(df)[1]
+    assert list(summary.all_years) == [0, year_bits(2012, 2015), 0]
+    for column in PAY_COLUMNS:
+        assert list(summary.years[column]) == [0, year_bits(2012), 0]
+
+
+def test_summary_year_range():
+    df = pd.DataFrame(
+        {
+            DataSchema.NAME: pd.Categorical(["a"]),
+            DataSchema.YEAR: [MIN_YEAR + YEAR_BITS],
+            DataSchema.SOURCE_ROWS: [1],
+            **{column: [10] for column in PAY_COLUMNS},
+        }
+    )
+    with pytest.raises(ValueError):
+        summarize(df)
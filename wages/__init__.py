@@ -0,0 +1 @@
+# data layer for the UC My Wages dashboard (loading, indexing and querying the salary tables)
@@ -0,0 +1,218 @@
+# offline build step: compiles the raw salary exports into the query-ready wage store read by the dashboard
+#
+#   python -m wages.build --names raw/university-of-california-*.csv --jobs assets/salaries_by_job.parquet
+#
+# accepted inputs:
+#   *.csv      raw Transparent California exports (pay in dollars, names in any case)
+#   *.parquet  tables in the app's original format (lowercase names, pay divided by 100)
+#
+# the store (wage_store/ in the repo by default, outside the served assets, see wages/store.py) holds one
+# uncompressed Arrow IPC file per table with the columns
+#   Employee Name         dictionary-encoded (int32 codes + the dictionary of names/job titles)
+#   Year                  int16
+#   Total Pay             uint32, whole dollars (fixed point, scale 1)
+#   Total Pay & Benefits  uint32, whole dollars
+#   Source Rows           uint16, number of source rows added up into the row
+#   Total Pay Raise Index, Total Pay & Benefits Raise Index
+#                         float64, cumulative raises of the name since its first row (see wages/projection.py),
+#                         NaN for rows that are not plotted (added up to 0)
+# and rows pre-sorted by (name code, year). employee names are coded in alphabetical order; job titles
+# keep the order of the source so the position dropdown keeps its curated order.
+# rows that share a (name, year), e.g. two employees with the same name, are added up into one row at build
+# time, so queries never have to de-duplicate. --keep-breakdown also stores the pay of every source row
+# (list columns "Total Pay Breakdown" and "Total Pay & Benefits Breakdown").
+# manifest.json records the sha256 of every input, so a refresh is reproducible and can be verified
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from wages import store
+from wages.index import RowRangeIndex
+from wages.projection import cumulative_raises
+from wages.schema import BREAKDOWN_COLUMNS, DataSchema, PAY_COLUMNS, RAISE_INDEX_COLUMNS
+
+# 2: (name, year) duplicates are aggregated, Source Rows column
+# 3: raise index columns
+STORE_VERSION = 3
+COLUMNS = [DataSchema.NAME, DataSchema.TOTAL_PAY, DataSchema.TOTAL_PAY_AND_BENEFITS, DataSchema.YEAR]
+
+# the original parquet tables store pay divided by 100
+LEGACY_PAY_SCALE = 100
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_source(path, min_pay=0):
+    # returns the COLUMNS of one input file with pay in dollars
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, engine="fastparquet", columns=COLUMNS)
+        df[PAY_COLUMNS] = df[PAY_COLUMNS].astype("float64") * LEGACY_PAY_SCALE
+    elif path.endswith(".csv"):
+        df = pd.read_csv(path, usecols=COLUMNS)
+        for column in PAY_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors="coerce")  # e.g. "Not Provided"
+        # the search matches against casefolded names
+        df[DataSchema.NAME] = (
+            df[DataSchema.NAME].astype(str).str.casefold().str.split().str.join(" ")
+        )
+    else:
+        raise ValueError("unsupported input (expected .csv or .parquet): " + path)
+
+    df = df.dropna(subset=COLUMNS)
+    if min_pay > 0:
+        df = df[df[DataSchema.TOTAL_PAY] >= min_pay]
+    return df
+
+
+def compile_table(df, sort_names=True, breakdown=False):
+    # dictionary-encode names, narrow the dtypes, sort rows by (name code, year), add up duplicates and add the
+    # raise index
+    names = df[DataSchema.NAME].astype(str)
+    if sort_names:
+        categories = np.sort(names.unique())
+    else:
+        categories = pd.unique(names)
+
+    table = pd.DataFrame(
+        {
+            DataSchema.NAME: pd.Categorical(names, categories=categories),
+            DataSchema.TOTAL_PAY: df[DataSchema.TOTAL_PAY].round().astype("uint32").to_numpy(),
+            DataSchema.TOTAL_PAY_AND_BENEFITS: df[DataSchema.TOTAL_PAY_AND_BENEFITS]
+            .round()
+            .astype("uint32")
+            .to_numpy(),
+            DataSchema.YEAR: df[DataSchema.YEAR].astype("int16").to_numpy(),
+        }
+    )
+    # sorting a categorical sorts by code
+    table = table.sort_values(by=[DataSchema.NAME, DataSchema.YEAR], kind="stable")
+    return add_raise_index(aggregate_duplicates(table.reset_index(drop=True), breakdown))
+
+
+def aggregate_duplicates(table, breakdown=False):
+    # add up the rows of a table sorted by (name code, year) that share a (name, year). groups keep their
+    # number of source rows: a group that adds up to 0 is dropped at query time (see wages/query.py), and
+    # whether it adds up to 0 depends on the compensation type
+    codes = table[DataSchema.NAME].cat.codes.to_numpy()
+    years = table[DataSchema.YEAR].to_numpy()
+    first = np.ones(len(table), dtype=bool)
+    first[1:] = (codes[1:] != codes[:-1]) | (years[1:] != years[:-1])
+    starts = np.flatnonzero(first)
+
+    aggregated = table.iloc[starts].reset_index(drop=True)
+    for column, breakdown_column in zip(PAY_COLUMNS, BREAKDOWN_COLUMNS):
+        values = table[column].to_numpy()
+        if len(starts):
+            totals = np.add.reduceat(values.astype(np.uint64), starts)
+            if totals.max() > np.iinfo(np.uint32).max:
+                raise ValueError(column + " of a (name, year) does not fit in uint32")
+            aggregated[column] = totals.astype("uint32")
+        if breakdown:
+            aggregated[breakdown_column] = [part.tolist() for part in np.split(values, starts[1:])]
+    aggregated[DataSchema.SOURCE_ROWS] = np.diff(np.append(starts, len(table))).astype("uint16")
+    return aggregated
+
+
+def add_raise_index(table):
+    # cumulative raises of every row since the first row of its name, over the rows that are plotted for the pay
+    # column (rows added up to 0 are dropped at query time, so they are skipped here too)
+    codes = table[DataSchema.NAME].cat.codes.to_numpy()
+    categories = table[DataSchema.NAME].cat.categories
+    years = table[DataSchema.YEAR].to_numpy()
+    source_rows = table[DataSchema.SOURCE_ROWS].to_numpy()
+    for column in PAY_COLUMNS:
+        pay = table[column].to_numpy()
+        rows = np.flatnonzero((source_rows == 1) | (pay != 0))
+        index = np.full(len(table), np.nan)
+        index[rows] = cumulative_raises(
+            RowRangeIndex(codes[rows], categories).offsets, years[rows], pay[rows]
+        )
+        table[RAISE_INDEX_COLUMNS[column]] = index
+    return table
+
+
+def write_table(df, name, out_dir):
+    path = os.path.join(out_dir, name + ".arrow")
+    # write to a temporary file and swap it in, workers that mapped the old file keep a valid mapping
+    feather.write_feather(df, path + ".tmp", compression="uncompressed")
+    os.replace(path + ".tmp", path)
+
+
+def build(names_paths, jobs_paths, out_dir=store.STORE_PATH, min_pay=0, breakdown=False):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # an interrupted build must not look complete
+    manifest = {
+        "version": STORE_VERSION,
+        "pay_scale": 1,
+        "breakdown": breakdown,
+        "sources": {},
+        "tables": {},
+    }
+
+    for table_name, paths, sort_names in [
+        ("jobs", jobs_paths, False),
+        ("names", names_paths, True),
+    ]:
+        t0 = time.time()
+        df = pd.concat(
+            [read_source(path, min_pay if table_name == "names" else 0) for path in paths],
+            ignore_index=True,
+        )
+        source_rows = len(df)
+        df = compile_table(df, sort_names=sort_names, breakdown=breakdown)
+        write_table(df, table_name, out_dir)
+
+        manifest["sources"][table_name] = [
+            {"file": os.path.basename(path), "sha256": file_hash(path)} for path in paths
+        ]
+        manifest["tables"][table_name] = {
+            "rows": len(df),
+            "source_rows": source_rows,
+            "unique_names": len(df[DataSchema.NAME].cat.categories),
+        }
+        print(
+            table_name + ": " + str(source_rows) + " -> " + str(len(df)) + " rows, " + str(time.time() - t0)
+        )
+
+    # the manifest is written last; its presence marks a complete store
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compile salary exports into the wage store")
+    parser.add_argument("--names", nargs="+", default=[store.NAME_DATA_PATH])
+    parser.add_argument("--jobs", nargs="+", default=[store.JOB_DATA_PATH])
+    parser.add_argument("--out", default=store.STORE_PATH)
+    parser.add_argument(
+        "--min-pay",
+        type=float,
+        default=0,
+        help="drop employees with a lower Total Pay (the published data uses 30000)",
+    )
+    parser.add_argument(
+        "--keep-breakdown",
+        action="store_true",
+        help="keep the pay of every source row added up into a (name, year) row",
+    )
+    args = parser.parse_args()
+    build(args.names, args.jobs, args.out, args.min_pay, args.keep_breakdown)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# server-side store for the data frames passed between the dashboard callbacks
+#
+# instead of sending a data frame to the browser as json (and having the browser post it back to the next
+# callback), a callback puts the frame here and only returns its key. keys are hashes of the query the frame is
+# the result of (and of a namespace identifying the data and the code that computed it), so the same selection
+# always maps to the same key, and a query already stored (refresh) costs a hash: the frame is neither
+# computed, serialized nor copied again. a frame is serialized once, when it is put.
+# stored frames are shared, not copied: callers must not modify the frames they put or get
+#
+# two tiers:
+#   memory: an LRU of decoded frames per process, entries expire after ttl seconds
+#   disk: the serialized frames in a directory shared by all gunicorn workers, so a key produced by one
+#         worker can be read by another. files older than ttl are swept on put (only the store's own
+#         <key>.arrow files: the directory is configurable and may hold other files)
+# keys come back from the browser: anything but a key the store could have produced is a miss
+import collections
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from wages.codec import frame_from_bytes, frame_to_bytes
+
+CACHE_PATH = os.environ.get(
+    "UCMW_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ucmw-cache")
+)
+SWEEP_INTERVAL = 60  # seconds between sweeps of expired files
+KEY_PATTERN = re.compile(r"[0-9a-f]{32}")  # blake2b digest (16 bytes) in hex
+FILE_PATTERN = re.compile(KEY_PATTERN.pattern + r"\.arrow")
+
+
+class ServerSideStore:
+    def __init__(self, max_items=256, ttl=3600, directory=CACHE_PATH, namespace=""):
+        # namespace: identifies the data and code the frames are computed from (the directory may be shared
+        # with processes of another deploy)
+        self.max_items = max_items
+        self.namespace = namespace
+        self.ttl = ttl
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._items = collections.OrderedDict()  # key -> (expires, frame, size)
+        self._lock = threading.Lock()
+        self._last_sweep = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0  # serialized frame bytes that did not travel to the browser and back
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".arrow")
+
+    def _remember(self, key, df, size):
+        with self._lock:
+            self._items[key] = (time.time() + self.ttl, df, size)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def key(self, query):
+        # query: json-serializable and canonical (equal queries are equal values, e.g. WageQuery.canonical)
+        data = json.dumps([self.namespace, query], separators=(",", ":")).encode()
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def refresh(self, query):
+        # the key of query if its frame is stored (its ttl starts over), None otherwise. a frame stored by
+        # another worker is only on disk: it is read by the next get
+        key = self.key(query)
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] >= time.time():
+                self._items[key] = (time.time() + self.ttl, item[1], item[2])
+                self._items.move_to_end(key)
+                if self.directory:
+                    try:
+                        os.utime(self._path(key))
+                    except FileNotFoundError:
+                        return None  # swept by another worker: put writes it again
+                self.bytes_saved += item[2] - len(key)
+                return key
+        if self.directory:
+            path = self._path(key)
+            try:
+                if os.path.getmtime(path) + self.ttl >= time.time():
+                    os.utime(path)
+                    self.bytes_saved += os.path.getsize(path) - len(key)
+                    return key
+            except FileNotFoundError:
+                pass
+        return None
+
+    def put(self, query, df):
+        # stores df, the result of query, and returns its key. the frame is serialized once, to be written to
+        # the disk tier (or, without one, for bytes_saved)
+        key = self.key(query)
+        data = frame_to_bytes(df)
+        self._remember(key, df, len(data))
+        self.bytes_saved += len(data) - len(key)
+
+        if self.directory:
+            path = self._path(key)
+            tmp_path = path + "." + str(os.getpid()) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.sweep()
+        return key
+
+    def get(self, key):
+        # the frame stored under key, or None if it expired/was evicted everywhere
+        if not isinstance(key, str) or not KEY_PATTERN.fullmatch(key):
+            return None
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] < time.time():
+                del self._items[key]
+                item = None
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                self.bytes_saved += item[2] - len(key)
+                return item[1]
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                if os.path.getmtime(path) + self.ttl >= time.time():
+                    with open(path, "rb") as f:
+                        data = f.read()
+                    df = frame_from_bytes(data)
+                    self._remember(key, df, len(data))
+                    self.disk_hits += 1
+                    self.bytes_saved += len(data) - len(key)
+                    return df
+            except FileNotFoundError:
+                pass
+
+        self.misses += 1
+        return None
+
+    def sweep(self):
+        now = time.time()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        for entry in os.scandir(self.directory):
+            if not FILE_PATTERN.fullmatch(entry.name):
+                continue
+            try:
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime + self.ttl < now:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # removed by another worker
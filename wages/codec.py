@@ -0,0 +1,139 @@
+# encoding of the data frames kept in dcc.Store components (and in the server-side store)
+#
+# every store-producing callback goes through encode_frame/decode_frame. the codec is picked with the
+# UCMW_STORE_CODEC environment variable; decode_frame recognizes all of them, so payloads written with one
+# codec still load after switching to another
+#   "json": df.to_json(orient="split"), the original format
+#   "columns": columnar typed arrays. integer columns are narrowed to the smallest type that holds their
+#              values and sent as base64, categoricals as their categories + narrowed codes. its column
+#              descriptions cost ~200 bytes, so it is only smaller than json from ~40 rows on
+#   "arrow": base64 Arrow IPC stream. carries a schema of a few hundred bytes, so it only pays off for
+#            larger frames
+#   "auto" (default): json below COLUMNS_MIN_ROWS rows (e.g. the traces ledgers, which compaction keeps
+#                     small), columns from there on
+import base64
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+STORE_CODEC = os.environ.get("UCMW_STORE_CODEC", "auto")
+COLUMNS_MIN_ROWS = 40  # see benchmarks/store_codec.py
+
+
+def frame_to_bytes(df):
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_from_bytes(data):
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+
+def narrow(values):
+    # smallest integer dtype that holds every value of an integer array
+    if len(values) == 0:
+        return values.astype(np.int8)
+    low, high = int(values.min()), int(values.max())
+    if low >= 0:
+        return values.astype(np.min_scalar_type(high))
+    # a signed type for both ends (min_scalar_type of a positive value is unsigned)
+    return values.astype(np.result_type(np.min_scalar_type(low), np.min_scalar_type(-high - 1)))
+
+
+def encode_array(values):
+    values = np.ascontiguousarray(values)
+    if values.dtype.kind in "iu":
+        values = narrow(values)
+    return {"dtype": values.dtype.str, "data": base64.b64encode(values.tobytes()).decode("ascii")}
+
+
+def decode_array(column):
+    return np.frombuffer(base64.b64decode(column["data"]), dtype=np.dtype(column["dtype"]))
+
+
+class JsonCodec:
+    name = "json"
+
+    @staticmethod
+    def encode(df):
+        return df.to_json(orient="split")
+
+    @staticmethod
+    def decode(payload):
+        return pd.read_json(payload, orient="split")
+
+
+class ArrowCodec:
+    name = "arrow"
+
+    @staticmethod
+    def encode(df):
+        return {"codec": "arrow", "data": base64.b64encode(frame_to_bytes(df)).decode("ascii")}
+
+    @staticmethod
+    def decode(payload):
+        return frame_from_bytes(base64.b64decode(payload["data"]))
+
+
+class ColumnarCodec:
+    name = "columns"
+
+    @staticmethod
+    def encode(df):
+        columns = []
+        for name, series in df.items():
+            column = {"name": name, "type": series.dtype.name}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column["categories"] = series.cat.categories.tolist()
+                column["codes"] = encode_array(series.cat.codes.to_numpy())
+            elif series.dtype.kind in "iufb":
+                column["values"] = encode_array(series.to_numpy())
+            else:
+                column["values"] = series.tolist()
+            columns.append(column)
+
+        if isinstance(df.index, pd.RangeIndex):
+            index = {"start": df.index.start, "stop": df.index.stop, "step": df.index.step}
+        else:
+            index = dict(encode_array(df.index.to_numpy()), type=df.index.dtype.name)
+        return {"codec": "columns", "index": index, "columns": columns}
+
+    @staticmethod
+    def decode(payload):
+        data = {}
+        for column in payload["columns"]:
+            if "categories" in column:
+                data[column["name"]] = pd.Categorical.from_codes(
+                    decode_array(column["codes"]), column["categories"]
+                )
+            elif isinstance(column["values"], dict):
+                data[column["name"]] = decode_array(column["values"]).astype(column["type"])
+            else:
+                data[column["name"]] = pd.array(column["values"], dtype=column["type"])
+
+        index = payload["index"]
+        if "start" in index:
+            index = pd.RangeIndex(index["start"], index["stop"], index["step"])
+        else:
+            index = pd.Index(decode_array(index).astype(index.get("type", index["dtype"])))
+        return pd.DataFrame(data, index=index)
+
+
+CODECS = {codec.name: codec for codec in [JsonCodec, ArrowCodec, ColumnarCodec]}
+
+
+def encode_frame(df, codec=STORE_CODEC):
+    if codec == "auto":
+        codec = "columns" if len(df) >= COLUMNS_MIN_ROWS else "json"
+    return CODECS[codec].encode(df)
+
+
+def decode_frame(payload):
+    if isinstance(payload, str):
+        return JsonCodec.decode(payload)
+    return CODECS[payload["codec"]].decode(payload)
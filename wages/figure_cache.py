@@ -0,0 +1,53 @@
+# cache of figures that only depend on a few data files and a small set of control values (the Data Viz page:
+# 2 positions x 2 wage types x 3 dates, and the static proposal plot)
+#
+# a figure is built once per control values and kept serialized: as the plain dicts/lists of its JSON, which
+# is what Dash sends to the browser. serving it touches neither pandas nor plotly's validation, Dash only
+# encodes the plain data. entries are keyed by the contents of the data files: the files are checked (stat)
+# on every lookup and hashed again when their size or mtime changed; new contents drop every figure
+import json
+import os
+import threading
+
+import plotly.io as pio
+
+from wages.build import file_hash
+
+
+class FigureCache:
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self._stats = None
+        self._key = None
+        self._figures = {}  # control values -> serialized figure
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self):
+        # hash of the contents of the data files
+        stats = [(s.st_size, s.st_mtime_ns) for s in map(os.stat, self.paths)]
+        with self._lock:
+            if stats != self._stats:
+                key = "-".join(file_hash(path)[:16] for path in self.paths)
+                if key != self._key:
+                    self._figures.clear()
+                self._stats, self._key = stats, key
+            return self._key
+
+    def get(self, values, build):
+        # the serialized figure for values (a hashable), build(key) -> go.Figure on a miss
+        key = self.key()
+        figure = self._figures.get(values)
+        if figure is not None:
+            self.hits += 1
+            return figure
+        self.misses += 1
+        figure = json.loads(pio.to_json(build(key), validate=False))
+        with self._lock:
+            if key == self._key:
+                self._figures[values] = figure
+        return figure
+
+    def stats(self):
+        return {"items": len(self._figures), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,121 @@
+# figure helpers: incremental figure updates and dumbbell (lollipop) traces
+#
+# incremental figure updates
+# the line plots of the dashboard only ever gain traces or get traces emptied (trace indices are kept in the
+# traces ledgers), so instead of sending whole figures to the server and back, update_figures returns one delta
+# per figure and assets/dashboard_callbacks.js applies it to the figure already in the browser:
+#   figure   the figure to start from, set only when the figure is reset (a full render)
+#   clear    indices of the traces to empty (x, y and customdata set to [])
+#   keep     indices of the traces to keep, in order (compaction: the other traces are dropped), or None
+#   add      traces to append
+#   layout   {"path.to.attribute": value} layout attributes to set
+# apply_delta is the same applier in python (for the benchmarks and to check the protocol)
+#
+# removed names leave empty traces behind (the other traces keep their indices); once there are more than
+# MAX_DEAD_TRACES of them, compact_ledger drops them from the figure and renumbers the ledger, so the figures
+# (and what plotly redraws) stay proportional to the names shown, however long the session
+import copy
+
+import numpy as np
+import plotly.graph_objects as go
+
+MAX_DEAD_TRACES = 10
+
+
+class FigureDelta:
+    def __init__(self, trace_count=0, figure=None):
+        # trace_count: traces in the figure the delta is applied to; figure: a go.Figure to reset to
+        self.figure = figure
+        self.trace_count = len(figure.data) if figure is not None else trace_count
+        self.clear = []
+        self.keep = None
+        self.add = []
+        self.layout = {}
+
+    def add_trace(self, trace):
+        # appends trace (a go trace) and returns its index in the updated figure
+        self.add.append(trace.to_plotly_json())
+        self.trace_count += 1
+        return self.trace_count - 1
+
+    def clear_trace(self, index):
+        self.clear.append(int(index))
+
+    def compact(self, keep):
+        # keep only the traces at the indices keep (in that order); traces added afterwards follow them
+        if self.add:
+            raise ValueError("compact before adding traces")
+        self.clear = []  # the emptied traces are dropped anyway
+        self.keep = [int(index) for index in keep]
+        self.trace_count = len(self.keep)
+
+    def update_layout(self, path, value):
+        self.layout[path] = value
+
+    def to_dict(self):
+        return {
+            "figure": self.figure.to_plotly_json() if self.figure is not None else None,
+            "clear": self.clear,
+            "keep": self.keep,
+            "add": self.add,
+            "layout": self.layout,
+        }
+
+
+def apply_delta(figure, delta):
+    # the figure (a dict) after the delta (a dict from FigureDelta.to_dict); figure is not modified
+    if delta is None:
+        return figure
+    figure = copy.deepcopy(delta["figure"] if delta["figure"] is not None else figure or {})
+    data = figure.setdefault("data", [])
+    for index in delta["clear"]:
+        data[index]["x"] = []
+        data[index]["y"] = []
+        data[index]["customdata"] = []
+    if delta.get("keep") is not None:
+        data[:] = [data[index] for index in delta["keep"]]
+    data.extend(copy.deepcopy(delta["add"]))
+    for path, value in delta["layout"].items():
+        node = figure.setdefault("layout", {})
+        keys = path.split(".")
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+    return figure
+
+
+def compact_ledger(df_traces, delta):
+    # df_traces: ledger [name, Index] of the live traces of the figure delta applies to, after deleting the
+    # removed names. drops the dead traces when there are too many and returns the ledger with the new indices
+    dead = delta.trace_count - len(df_traces)
+    if dead <= MAX_DEAD_TRACES:
+        return df_traces
+    keep = np.sort(df_traces["Index"].to_numpy())
+    delta.compact(keep)
+    df_traces = df_traces.copy()
+    df_traces["Index"] = np.searchsorted(keep, df_traces["Index"].to_numpy())
+    return df_traces
+
+
+# dumbbell charts (the lollipop chart of the dashboard, the proposal chart of the Data Viz page): a row per
+# label with a line between two values and a marker per value. all the lines of a chart are one trace (segments
+# separated by gaps) and every series of markers is one trace, so the trace count does not grow with the rows
+def dumbbell_connectors(labels, start, end, **trace_kwargs):
+    # one "lines" trace with a segment from start[i] to end[i] at labels[i] for every row
+    count = len(labels)
+    x = np.empty((count, 3), dtype=object)
+    x[:, 0] = start
+    x[:, 1] = end
+    y = np.empty((count, 3), dtype=object)
+    y[:, 0] = labels
+    y[:, 1] = labels
+    trace_kwargs.setdefault("hoverinfo", "skip")
+    trace_kwargs.setdefault("showlegend", False)
+    return go.Scatter(
+        x=x.ravel().tolist(), y=y.ravel().tolist(), mode="lines", connectgaps=False, **trace_kwargs
+    )
+
+
+def dumbbell_markers(labels, x, **trace_kwargs):
+    # one "markers" trace with the value of every row
+    return go.Scatter(x=x, y=labels, mode="markers", **trace_kwargs)
@@ -0,0 +1,46 @@
+# row-range index over a table sorted by name code
+#
+# the wage store keeps df_names sorted by (name code, year), so the rows of one employee are contiguous.
+# offsets[code]:offsets[code + 1] is the row range of `code`, which turns a per-employee lookup into an
+# O(k) slice instead of an O(N) boolean mask over the whole table
+import numpy as np
+import pandas as pd
+
+
+class RowRangeIndex:
+    def __init__(self, codes, categories):
+        codes = np.asarray(codes)
+        if len(codes) and np.any(codes[1:] < codes[:-1]):
+            raise ValueError("RowRangeIndex needs rows sorted by code")
+        # an Index is kept as is: the table's own categories, with the hash table their lookups build (and the
+        # startup snapshot refers to them instead of pickling a copy, see wages/snapshot.py)
+        self.categories = categories if isinstance(categories, pd.Index) else pd.Index(categories)
+        self.offsets = np.zeros(len(self.categories) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self.categories)), out=self.offsets[1:])
+
+    @classmethod
+    def from_frame(cls, df, column):
+        # returns df stably sorted by column (rows of a name keep their order) and its index
+        names = df[column].astype("category")
+        codes = names.cat.codes.to_numpy()
+        order = np.argsort(codes, kind="stable")
+        return df.iloc[order], cls(codes[order], names.cat.categories)
+
+    def __len__(self):
+        return len(self.categories)
+
+    def codes(self, names):
+        # sorted unique codes of the known names (unknown names are dropped)
+        codes = self.categories.get_indexer(names)
+        return np.unique(codes[codes >= 0])
+
+    def range(self, code):
+        return self.offsets[code], self.offsets[code + 1]
+
+    def rows(self, codes):
+        # positions of the rows of every code, in the order of codes (concatenated aranges)
+        codes = np.asarray(codes, dtype=np.int64)
+        starts = self.offsets[codes]
+        lengths = self.offsets[codes + 1] - starts
+        ends = np.cumsum(lengths)
+        return np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - lengths), lengths)
@@ -0,0 +1,35 @@
+# (label, year) -> pay lookups, e.g. the starting compensation of a position or an employee in a year
+#
+# the wage store has one row per (name, year), sorted by year within a name (see wages/build.py), and the
+# summary of a table has the years of every name as a bitmask (see wages/summary.py). the row of (code, year)
+# is the first row of the name + the number of its years before `year` (the set bits below the year's bit),
+# so a lookup is a hash of the label and a few integer operations: no mask over the table, and nothing to
+# build or keep in memory besides the index and summary the query engine already has
+from wages.schema import MIN_YEAR, PAY_COLUMNS
+from wages.summary import YEAR_BITS
+
+
+class PayLookup:
+    def __init__(self, df, index, summary):
+        # df sorted by name code (the wage store's order), index its RowRangeIndex and summary its WageSummary
+        self.index = index
+        self.summary = summary
+        self.pay = {column: df[column].to_numpy() for column in PAY_COLUMNS}
+
+    def row(self, label, year):
+        # position of the (label, year) row in the table, None if there is none
+        try:
+            code = self.index.categories.get_loc(label)
+        except (KeyError, TypeError):
+            return None
+        bit = int(year) - MIN_YEAR
+        if not 0 <= bit < YEAR_BITS:
+            return None
+        mask = int(self.summary.all_years[code])
+        if not (mask >> bit) & 1:
+            return None
+        return int(self.index.offsets[code]) + bin(mask & ((1 << bit) - 1)).count("1")
+
+    def pay_at(self, label, year, column):
+        row = self.row(label, year)
+        return None if row is None else self.pay[column][row].item()
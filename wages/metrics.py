@@ -0,0 +1,280 @@
+# per-callback latency and payload metrics, served in the Prometheus text format at /metrics
+#
+# instrument(app) wraps every registered callback (including the ones Dash adds on the first request); each
+# call records
+#   ucmw_callback_seconds{callback, phase}             histogram of the time spent in each phase:
+#       decode   reading the frames the callback gets through its stores (code inside phase("decode"))
+#       encode   writing the frames it returns (phase("encode")) and Dash serializing the outputs (the
+#                wrapped callbacks get their own to_json, see wrap_callback; dash._callback is not patched)
+#       compute  the rest of the call
+#       total    the whole call
+#   ucmw_callback_payload_bytes{callback, direction}   histogram of the request body (inputs and states posted
+#                                                      by the browser) and of the response body
+#   ucmw_callback_calls_total{callback, outcome}       ok, prevented (PreventUpdate) or error
+# plus the counters of register_counters (e.g. the hits of the server-side store).
+#
+# every process (gunicorn worker) keeps its own metrics and writes them to UCMW_METRICS_DIR/<pid>.json at most
+# once per FLUSH_INTERVAL; /metrics adds up the files of all workers, so any worker can answer the scrape.
+# files of workers that exited are kept (their calls still count). the directory is per deploy: gunicorn.conf.py
+# points UCMW_METRICS_DIR at <tmp>/ucmw-metrics/<master pid> and empties it on startup (when_ready), so the
+# files of an earlier deploy are not added up. without it (e.g. python app.py) the directory is per process
+import bisect
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import types
+
+import flask
+from dash import _callback
+from dash.exceptions import PreventUpdate
+
+METRICS_PATH = os.environ.get(
+    "UCMW_METRICS_DIR", os.path.join(tempfile.gettempdir(), "ucmw-metrics", str(os.getpid()))
+)
+FLUSH_INTERVAL = 1  # seconds between writes of a worker's metrics file
+
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+SIZE_BUCKETS = [2**k for k in range(6, 26, 2)]  # 64 B to 16 MB
+PHASES = ["decode", "compute", "encode"]
+
+# time spent per phase in the callback running in this context (None outside instrumented callbacks)
+_phases = contextvars.ContextVar("ucmw_phases", default=None)
+
+
+@contextlib.contextmanager
+def phase(name):
+    # adds the time spent in the block to `name` of the running callback (phases do not nest)
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] += time.perf_counter() - t0
+
+
+class Registry:
+    def __init__(self, directory=METRICS_PATH):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.histograms = {}  # (name, labels) -> [count per bucket..., count above the last bucket, sum]
+        self.buckets = {}  # name -> bucket upper bounds
+        self.counters = collections.Counter()  # (name, labels) -> value
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._last_flush = 0
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.buckets[name] = buckets
+            values = self.histograms.get(key)
+            if values is None:
+                values = self.histograms[key] = [0] * (len(buckets) + 2)
+            values[bisect.bisect_left(buckets, value)] += 1
+            values[-1] += value
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def register_counters(self, collector):
+        # collector() returns {metric name: value} of counters kept elsewhere in the process
+        self.collectors.append(collector)
+
+    def record_call(self, callback, total, phases, outcome, request_size, response_size):
+        self.inc("ucmw_callback_calls_total", {"callback": callback, "outcome": outcome})
+        self.observe("ucmw_callback_seconds", {"callback": callback, "phase": "total"}, total, LATENCY_BUCKETS)
+        phases["compute"] = max(total - phases["decode"] - phases["encode"], 0)
+        for name in PHASES:
+            self.observe(
+                "ucmw_callback_seconds", {"callback": callback, "phase": name}, phases[name], LATENCY_BUCKETS
+            )
+        for direction, size in [("request", request_size), ("response", response_size)]:
+            if size is not None:
+                self.observe(
+                    "ucmw_callback_payload_bytes",
+                    {"callback": callback, "direction": direction},
+                    size,
+                    SIZE_BUCKETS,
+                )
+        self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            histograms = [[name, list(labels), list(values)] for (name, labels), values in self.histograms.items()]
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+        for collector in self.collectors:
+            counters.extend([name, [], value] for name, value in collector().items())
+        return {"buckets": dict(self.buckets), "histograms": histograms, "counters": counters}
+
+    def flush(self, force=False):
+        now = time.time()
+        if not self.directory or (not force and now - self._last_flush < FLUSH_INTERVAL):
+            return
+        self._last_flush = now
+        path = os.path.join(self.directory, str(os.getpid()) + ".json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + ".tmp", path)
+
+    def collect(self):
+        # the metrics of all workers added up: buckets, histograms and counters keyed by (name, labels)
+        snapshots = [self.snapshot()]
+        if self.directory:
+            own_file = str(os.getpid()) + ".json"
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json") and entry.name != own_file:
+                    try:
+                        with open(entry.path) as f:
+                            snapshots.append(json.load(f))
+                    except (FileNotFoundError, ValueError):
+                        pass  # being replaced
+
+        buckets = {}
+        histograms = {}
+        counters = collections.Counter()
+        for snapshot in snapshots:
+            buckets.update(snapshot["buckets"])
+            for name, labels, values in snapshot["histograms"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                if key in histograms:
+                    histograms[key] = [a + b for a, b in zip(histograms[key], values)]
+                else:
+                    histograms[key] = list(values)
+            for name, labels, value in snapshot["counters"]:
+                counters[(name, tuple(tuple(label) for label in labels))] += value
+        return buckets, histograms, counters
+
+    def render(self):
+        buckets, histograms, counters = self.collect()
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append("# TYPE " + name + " counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(name + format_labels(labels) + " " + format_value(value))
+        for name in sorted({name for name, _ in histograms}):
+            lines.append("# TYPE " + name + " histogram")
+            for (histogram_name, labels), values in sorted(histograms.items()):
+                if histogram_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets[name] + ["+Inf"], values[:-1]):
+                    cumulative += count
+                    lines.append(
+                        name + "_bucket" + format_labels(labels + (("le", str(bound)),)) + " " + str(cumulative)
+                    )
+                lines.append(name + "_sum" + format_labels(labels) + " " + format_value(values[-1]))
+                lines.append(name + "_count" + format_labels(labels) + " " + str(cumulative))
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(key + '="' + str(value).replace('"', '\\"') + '"' for key, value in labels) + "}"
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+
+def _timed_to_json(obj):
+    with phase("encode"):
+        return _callback.to_json(obj)
+
+
+def with_timed_to_json(func):
+    # Dash serializes the outputs of a callback with to_json, a global of dash._callback where its callback
+    # wrapper (add_context) is defined. the copy of the wrapper returned here looks its globals up in a copy
+    # of that module's namespace in which to_json is timed as the encode phase, so the serialization of the
+    # instrumented callbacks is timed and nothing else (the module and its other users are left alone)
+    if func.__globals__ is not vars(_callback):
+        return func  # not Dash's wrapper: only what it times itself counts as encode
+    timed = types.FunctionType(
+        func.__code__,
+        dict(func.__globals__, to_json=_timed_to_json),
+        func.__name__,
+        func.__defaults__,
+        func.__closure__,
+    )
+    timed.__kwdefaults__ = func.__kwdefaults__
+    return functools.update_wrapper(timed, func)
+
+
+def wrap_callback(func, name, registry=REGISTRY):
+    # func is the callback as Dash registered it: it takes the decoded request and returns the response body
+    func = with_timed_to_json(func)
+
+    @functools.wraps(func)
+    def instrumented(*args, **kwargs):
+        phases = collections.Counter()
+        token = _phases.set(phases)
+        request_size = flask.request.content_length if flask.has_request_context() else None
+        response = None
+        outcome = "error"
+        t0 = time.perf_counter()
+        try:
+            response = func(*args, **kwargs)
+            outcome = "ok"
+            return response
+        except PreventUpdate:
+            outcome = "prevented"
+            raise
+        finally:
+            total = time.perf_counter() - t0
+            _phases.reset(token)
+            response_size = len(response) if isinstance(response, str) else None
+            registry.record_call(name, total, phases, outcome, request_size, response_size)
+
+    instrumented.ucmw_instrumented = True
+    return instrumented
+
+
+def instrument(app, registry=REGISTRY):
+    # wraps the callbacks registered so far (import the pages first) and mounts /metrics on app.server
+    # relies on Dash internals, checked against dash==2.7.1 (requirements.txt): the callback maps
+    # (dash._callback.GLOBAL_CALLBACK_MAP, app.callback_map) and the to_json global of the callback wrappers
+    # (see with_timed_to_json). check them again when upgrading Dash
+    def wrap_callbacks():
+        for callback_map in [_callback.GLOBAL_CALLBACK_MAP, app.callback_map]:
+            for entry in callback_map.values():
+                func = entry.get("callback")
+                if func is not None and not getattr(func, "ucmw_instrumented", False):
+                    entry["callback"] = wrap_callback(func, func.__name__, registry)
+
+    wrap_callbacks()
+
+    # Dash adds its own callbacks (e.g. the page router) when it sets up the server on the first request, in
+    # before_request hooks registered before this one; they are wrapped once, after the first request's setup
+    # (Flask 2.3 has no before_first_request, Dash sets up its server the same way)
+    wrapped_after_setup = threading.Event()
+    lock = threading.Lock()
+
+    def wrap_callbacks_once():
+        if wrapped_after_setup.is_set():
+            return
+        with lock:
+            if not wrapped_after_setup.is_set():
+                wrap_callbacks()
+                wrapped_after_setup.set()
+
+    app.server.before_request(wrap_callbacks_once)
+    app.server.add_url_rule(
+        "/metrics",
+        "metrics",
+        lambda: flask.Response(registry.render(), mimetype="text/plain; version=0.0.4"),
+    )
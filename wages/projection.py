@@ -0,0 +1,87 @@
+# projected wages: a starting wage that gets the same year-to-year raises as an employee/position
+#
+# for every selected name the projection is initial_wage * the cumulative product of its raises
+# pay[year] / pay[previous year], rounded to 100s. all names are computed in one pass: the raises are laid out
+# in a names x years matrix (1.0 where a name has no row) and multiplied up along the years.
+# gaps: a name without a row for some year has no raise that year; the raise across the gap counts in the first
+# year after it (pay of that year / pay of the last year with a row), and the gap years get no projected point.
+# a raise that is undefined (0 pay after 0 pay) gives no projected value for that year and is skipped by the
+# following years, like pandas' cumprod
+#
+# raise index: the cumulative raises of every name from its first row are stored in the wage store (one column
+# per pay column, see wages/build.py), so the cumulative raises from any anchor row are index / index[anchor]
+# and a projection does not need the pay at all. the starting wage only scales the result: the projected
+# traces carry their cumulative raises (customdata) and the browser rescales them when the wage changes
+# (assets/dashboard_callbacks.js)
+import numpy as np
+
+MAX_MATRIX_CELLS = 1 << 24  # names x years cells multiplied at a time
+
+
+def cumulative_raises(offsets, years, pay):
+    # offsets: offsets[i]:offsets[i + 1] are the rows of name i, sorted by year (see wages/index.py)
+    # returns the cumulative raises of every row since the first row of its name (NaN where undefined)
+    offsets = np.asarray(offsets)
+    years = np.asarray(years, dtype=np.int64)
+    pay = np.asarray(pay, dtype=np.float64)
+    if len(years) == 0:
+        return np.zeros(0)
+
+    lengths = np.diff(offsets)
+    first_of_name = np.zeros(len(years), dtype=bool)
+    first_of_name[offsets[:-1][lengths > 0]] = True
+    if np.any(np.diff(years)[~first_of_name[1:]] <= 0):
+        raise ValueError("cumulative_raises needs one row per name and year, sorted by year")
+
+    # raise of every row over the previous row of its name (the first row of a name has none)
+    prior = np.empty_like(pay)
+    prior[1:] = pay[:-1]
+    prior[first_of_name] = pay[first_of_name]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adjustment = (pay - prior) / prior + 1
+    undefined = np.isnan(adjustment)
+    adjustment[undefined] = 1.0
+
+    # names x years matrices of raises (a block of names at a time), multiplied up along the years
+    year_column = years - years.min()
+    width = int(year_column.max()) + 1
+    block = max(1, MAX_MATRIX_CELLS // width)
+    cumulative = np.empty(len(years))
+    for first in range(0, len(lengths), block):
+        start, stop = offsets[first], offsets[min(first + block, len(lengths))]
+        name_of_row = np.repeat(np.arange(min(block, len(lengths) - first)), lengths[first : first + block])
+        raises = np.ones((min(block, len(lengths) - first), width))
+        raises[name_of_row, year_column[start:stop]] = adjustment[start:stop]
+        cumulative[start:stop] = np.cumprod(raises, axis=1)[name_of_row, year_column[start:stop]]
+    cumulative[undefined] = np.nan
+    return cumulative
+
+
+def project_wages(offsets, years, pay, initial_wage):
+    # the projected wage of every row (offsets, years, pay as in cumulative_raises)
+    return scale_raises(cumulative_raises(offsets, years, pay), initial_wage)
+
+
+def scale_raises(cumulative, initial_wage):
+    # no projected values (NaN) while the starting wage is not a number (e.g. an empty input field): the
+    # browser scales the cumulative raises once a wage is entered
+    try:
+        initial_wage = float(initial_wage)
+    except (TypeError, ValueError):
+        return np.full(np.shape(cumulative), np.nan)
+    return np.round(cumulative * initial_wage, -2)  # round to 100s to clean up the hover text
+
+
+def raises_from_index(offsets, index):
+    # cumulative raises since the first row of every name from the stored raise index of its rows (offsets as
+    # in cumulative_raises). NaN for every row of a name whose index is not usable (an undefined raise or a 0 pay
+    # in its rows): those have to be computed from the pay with cumulative_raises
+    offsets = np.asarray(offsets)
+    lengths = np.diff(offsets)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anchor = np.repeat(index[offsets[:-1][lengths > 0]], lengths[lengths > 0])
+        cumulative = index / anchor
+    usable = np.isfinite(cumulative) & (cumulative > 0)
+    usable_names = np.logical_and.reduceat(usable, offsets[:-1][lengths > 0]) if len(usable) else usable
+    cumulative[~np.repeat(usable_names, lengths[lengths > 0])] = np.nan
+    return cumulative
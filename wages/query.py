@@ -0,0 +1,160 @@
+# wage query engine
+#
+# WageQuery answers the dashboard's one question: given the selected employee names, positions (jobs), year
+# range and compensation type, what are the (name, year, pay) points to plot? it replaces the chain of
+# filter callbacks (names -> jobs -> combined) with a single pass over numpy arrays:
+#   1. slice the rows of every selected job/name out of df_jobs/df_names with their row-range indexes
+#   2. keep the rows inside the year range
+#   3. drop (name, year) rows that were added up from several source rows and add up to 0, as the original
+#      callback did. the wage store already added up rows that share a (name, year) (see wages/build.py);
+#      only a job title equal to a selected employee name still needs adding up here
+# the rows carry the pay and the stored raise index (see wages/projection.py) of both compensation types, so
+# switching the compensation type does not run another query: for_compensation picks the rows and columns of
+# one type out of a result. the raise index is NaN for a job title equal to a selected employee name, whose
+# added up pay has no stored index
+# results are memoized on the canonicalized query, so repeated selections cost a dictionary lookup
+import functools
+
+import numpy as np
+import pandas as pd
+
+from wages.index import RowRangeIndex
+from wages.lookup import PayLookup
+from wages.schema import DataSchema, PAY_COLUMNS, RAISE_INDEX_COLUMNS
+from wages.summary import WageSummary
+
+
+class WageQuery:
+    def __init__(self, df_jobs, df_names, max_queries=256, indexes=None):
+        # indexes: WageQuery.indexes(df_jobs, df_names) built beforehand (e.g. loaded from the startup snapshot,
+        # see wages/snapshot.py)
+        self.df_jobs = df_jobs
+        self.df_names = df_names
+        if indexes is None:
+            indexes = self.indexes(df_jobs, df_names)
+        self.job_rows, self.name_rows, self.job_summary, self.name_summary = indexes
+        self.job_pay = PayLookup(df_jobs, self.job_rows, self.job_summary)
+        self.name_pay = PayLookup(df_names, self.name_rows, self.name_summary)
+        self._run = functools.lru_cache(maxsize=max_queries)(self._compute)
+
+    @staticmethod
+    def indexes(df_jobs, df_names):
+        # the row-range indexes and summaries of the tables: job_rows, name_rows, job_summary, name_summary
+        job_rows = RowRangeIndex(
+            df_jobs[DataSchema.NAME].cat.codes.to_numpy(),
+            df_jobs[DataSchema.NAME].cat.categories,
+        )
+        name_rows = RowRangeIndex(
+            df_names[DataSchema.NAME].cat.codes.to_numpy(),
+            df_names[DataSchema.NAME].cat.categories,
+        )
+        return job_rows, name_rows, WageSummary(df_jobs, job_rows), WageSummary(df_names, name_rows)
+
+    @staticmethod
+    def canonical(names, jobs, years):
+        # order and repeats of the selections do not change the result
+        return (
+            tuple(sorted(set(names or []))),
+            tuple(sorted(set(jobs or []))),
+            (int(years[0]), int(years[1])),
+        )
+
+    def run(self, names, jobs, years):
+        # combined, de-duplicated rows [pay columns, Year, Employee Name, Source Rows, raise index columns] sorted
+        # by name and year (see for_compensation)
+        query = self.canonical(names, jobs, years)
+        return self._run(*query).copy()  # callers may modify the frame they get
+
+    @staticmethod
+    def for_compensation(df, compensation_type):
+        # the rows of a result plotted for compensation_type, [compensation_type, Year, Employee Name, Raise Index].
+        # rows added up from several source rows to 0 are not plotted, as the original callback did
+        added_up_to_0 = (df[DataSchema.SOURCE_ROWS].to_numpy() != 1) & (df[compensation_type].to_numpy() == 0)
+        return df.loc[
+            ~added_up_to_0,
+            [compensation_type, DataSchema.YEAR, DataSchema.NAME, RAISE_INDEX_COLUMNS[compensation_type]],
+        ].rename(columns={RAISE_INDEX_COLUMNS[compensation_type]: DataSchema.RAISE_INDEX})
+
+    def cache_info(self):
+        return self._run.cache_info()
+
+    def pay_at(self, label, year, compensation_type):
+        # pay of a position (or else an employee) in a year, None if it has no row that year (see wages/lookup.py)
+        for lookup in [self.job_pay, self.name_pay]:
+            pay = lookup.pay_at(label, year, compensation_type)
+            if pay is not None:
+                return pay
+        return None
+
+    def years_mask(self, labels, compensation_type):
+        # year bitmask of every label (see wages/summary.py), jobs and names with that label together
+        masks = np.zeros(len(labels), dtype=np.uint16)
+        for index, summary in [(self.job_rows, self.job_summary), (self.name_rows, self.name_summary)]:
+            codes = index.categories.get_indexer(labels)
+            found = codes >= 0
+            masks[found] |= summary.years[compensation_type][codes[found]]
+        return masks
+
+    def _gather(self, df, index, selected, labels):
+        codes = index.codes(selected)
+        rows = index.rows(codes)
+        # map each row's code to the position of its label in the combined (sorted) labels
+        label_codes = labels.get_indexer(index.categories[codes])
+        return (
+            np.repeat(label_codes, index.offsets[codes + 1] - index.offsets[codes]),
+            df[DataSchema.YEAR].to_numpy()[rows],
+            df[DataSchema.SOURCE_ROWS].to_numpy()[rows],
+            # rows x pay columns, and rows x raise index columns (the rows of each column, not the whole table)
+            np.column_stack([df[column].to_numpy()[rows] for column in PAY_COLUMNS]),
+            np.column_stack([df[RAISE_INDEX_COLUMNS[column]].to_numpy()[rows] for column in PAY_COLUMNS]),
+        )
+
+    def _compute(self, names, jobs, years):
+        min_year, max_year = years
+        known_jobs = np.asarray(self.job_rows.categories[self.job_rows.codes(jobs)])
+        known_names = np.asarray(self.name_rows.categories[self.name_rows.codes(names)])
+        labels = pd.Index(np.union1d(known_jobs, known_names))
+
+        parts = [
+            self._gather(self.df_jobs, self.job_rows, jobs, labels),
+            self._gather(self.df_names, self.name_rows, names, labels),
+        ]
+        label_codes, year, source_rows, pay = [
+            np.concatenate([part[i] for part in parts]).astype(np.int64) for i in range(4)
+        ]
+        raise_index = np.concatenate([part[4] for part in parts])
+
+        in_range = (year >= min_year) & (year <= max_year)
+        keys = label_codes[in_range] * 10000 + year[in_range]
+        pay, source_rows, raise_index = pay[in_range], source_rows[in_range], raise_index[in_range]
+
+        if len(labels) == len(known_jobs) + len(known_names):
+            # every (label, year) is one row already
+            order = np.argsort(keys, kind="stable")
+            keys, pay, source_rows = keys[order], pay[order], source_rows[order]
+            raise_index = raise_index[order]
+        else:
+            # a job title and an employee name that happen to be equal are one label (and get added up)
+            keys, inverse = np.unique(keys, return_inverse=True)
+            pay = np.column_stack(
+                [np.bincount(inverse, weights=column, minlength=len(keys)) for column in pay.T]
+            ).astype(np.int64)
+            source_rows = np.bincount(inverse, weights=source_rows, minlength=len(keys)).astype(np.int64)
+            first_rows = np.unique(inverse, return_index=True)[1]
+            # the added up pay of a label shared by a job and a name has no stored raise index
+            shared = labels.get_indexer(np.intersect1d(known_jobs, known_names))
+            raise_index = np.where(
+                np.isin(keys // 10000, shared)[:, np.newaxis], np.nan, raise_index[first_rows]
+            )
+
+        # rows not plotted for any compensation type (see for_compensation)
+        keep = (source_rows == 1) | np.any(pay != 0, axis=1)
+        keys, pay, source_rows, raise_index = keys[keep], pay[keep], source_rows[keep], raise_index[keep]
+
+        columns = {column: pay[:, i] for i, column in enumerate(PAY_COLUMNS)}
+        columns[DataSchema.YEAR] = (keys % 10000).astype(np.int16)
+        columns[DataSchema.NAME] = pd.Categorical.from_codes(keys // 10000, labels)
+        columns[DataSchema.SOURCE_ROWS] = source_rows
+        for i, column in enumerate(PAY_COLUMNS):
+            columns[RAISE_INDEX_COLUMNS[column]] = raise_index[:, i]
+        return pd.DataFrame(columns)
@@ -0,0 +1,25 @@
+# create schemas so that you don't need to remember the labels when coding
+class DataSchema:
+    NAME = "Employee Name"
+    JOB = "Job Title"
+    JOB_ABBREVIATED = "Abbreviated Job Title"
+    TOTAL_PAY = "Total Pay"
+    TOTAL_PAY_AND_BENEFITS = "Total Pay & Benefits"
+    YEAR = "Year"
+    PRIORPAY = "Prior Year Pay"
+    ADJUSTMENT = "Adjustment"
+    CUMADJUSTMENT = "Cumulative Adjustment"
+    PROJECTEDPAY = "Projected Pay"
+    SOURCE_ROWS = "Source Rows"  # number of source rows added up into a (name, year) row of the wage store
+    RAISE_INDEX = "Raise Index"  # cumulative raises of a name since its first year (see wages/projection.py)
+
+
+PAY_COLUMNS = [DataSchema.TOTAL_PAY, DataSchema.TOTAL_PAY_AND_BENEFITS]
+# optional per-source-row pay of every (name, year) row (python -m wages.build --keep-breakdown)
+BREAKDOWN_COLUMNS = [column + " Breakdown" for column in PAY_COLUMNS]
+# raise index of every pay column (wage store columns "Total Pay Raise Index" and "Total Pay & Benefits Raise Index")
+RAISE_INDEX_COLUMNS = dict(zip(PAY_COLUMNS, [column + " " + DataSchema.RAISE_INDEX for column in PAY_COLUMNS]))
+
+# first and last year covered by the data
+MIN_YEAR = 2011
+MAX_YEAR = 2023
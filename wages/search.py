@@ -0,0 +1,278 @@
+# employee name search
+#
+# TrigramIndex is an inverted index from every 3-character substring (trigram) of a name to the codes of the
+# names containing it, built once over the unique names (the categories of df_names["Employee Name"]).
+# a substring query of length >= 3 can only match names that contain all of its trigrams, so the candidates
+# are the intersection of the query's posting lists. a verification pass then keeps the candidates that
+# really contain the query, which gives exactly the results of str.contains(query, regex=False)
+#
+# layout (numpy only, no per-trigram python objects):
+#   keys      sorted int64 trigram keys (3 code points of 21 bits each)
+#   offsets   postings[offsets[i]:offsets[i + 1]] are the sorted name codes containing keys[i]
+#   postings  int32 name codes
+#
+# FuzzyIndex matches the tokens (words) of a query against the tokens of the names, in any order and with typos:
+# "khosla pradeep", "pradeep kosla" and "pradeep khosla" all find "pradeep b khosla". typos are found with
+# symmetric deletes (SymSpell): every vocabulary token is indexed under itself and the strings made by deleting
+# one of its characters, so looking up the query token's own deletes finds the tokens within a couple of edits
+# without comparing against the whole vocabulary; the candidates are then verified with the real edit distance
+import hashlib
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+TRIGRAM = 3
+CHUNK_SIZE = 50000  # names encoded at once while building, bounds the temporary memory
+# seconds; past it no more typo candidates are checked (the exact token is checked first) and the remaining query
+# tokens are only matched exactly. the search can overrun it by one edit distance and the exact lookups
+FUZZY_TIME_BUDGET = 0.05
+FUZZY_MAX_CANDIDATES = 2000  # vocabulary tokens a query token is compared with (edit distance), at most
+FUZZY_MAX_TOKEN_MATCHES = 50  # vocabulary tokens a query token may match (the closest ones)
+
+
+def trigram_keys(codepoints):
+    # codepoints: (n, width) uint32 array -> (n, width - 2) int64 array of trigram keys
+    a = codepoints.astype(np.int64)
+    return (a[:, :-2] << 42) | (a[:, 1:-1] << 21) | a[:, 2:]
+
+
+class TrigramIndex:
+    def __init__(self, names):
+        self.names = np.asarray(names, dtype=object)
+
+        pair_keys = []
+        pair_codes = []
+        for start in range(0, len(self.names), CHUNK_SIZE):
+            chunk = self.names[start : start + CHUNK_SIZE].astype(str)
+            if chunk.dtype.itemsize // 4 < TRIGRAM:
+                continue  # every name in the chunk is too short to have a trigram
+            # fixed-width unicode array viewed as one code point per column, padded with 0
+            codepoints = chunk.view(np.uint32).reshape(len(chunk), -1)
+            keys = trigram_keys(codepoints)
+            lengths = np.char.str_len(chunk)
+            valid = np.arange(keys.shape[1]) < (lengths - (TRIGRAM - 1))[:, None]
+            rows, _ = np.nonzero(valid)
+            pair_keys.append(keys[valid])
+            pair_codes.append((rows + start).astype(np.int32))
+
+        if pair_keys:
+            pair_keys = np.concatenate(pair_keys)
+            pair_codes = np.concatenate(pair_codes)
+        else:
+            pair_keys = np.empty(0, dtype=np.int64)
+            pair_codes = np.empty(0, dtype=np.int32)
+
+        # sort by (key, code) and drop trigrams repeated within a name
+        order = np.lexsort((pair_codes, pair_keys))
+        pair_keys = pair_keys[order]
+        pair_codes = pair_codes[order]
+        keep = np.ones(len(pair_keys), dtype=bool)
+        keep[1:] = (pair_keys[1:] != pair_keys[:-1]) | (pair_codes[1:] != pair_codes[:-1])
+        pair_keys = pair_keys[keep]
+
+        self.postings = pair_codes[keep]
+        self.keys, starts = np.unique(pair_keys, return_index=True)
+        self.offsets = np.append(starts, len(pair_keys)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.names)
+
+    def posting(self, key):
+        i = np.searchsorted(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return self.postings[:0]
+        return self.postings[self.offsets[i] : self.offsets[i + 1]]
+
+    def candidates(self, query):
+        # codes of the names that contain every trigram of the query (a superset of the matches)
+        codepoints = np.array([query]).view(np.uint32).reshape(1, -1)
+        keys = np.unique(trigram_keys(codepoints)[0])
+        postings = sorted((self.posting(key) for key in keys), key=len)
+        codes = postings[0]
+        for posting in postings[1:]:
+            if len(codes) == 0:
+                break
+            codes = np.intersect1d(codes, posting, assume_unique=True)
+        return codes
+
+    def search(self, query):
+        # sorted codes of the names containing query, same semantics as str.contains(query, regex=False)
+        if len(query) < TRIGRAM:
+            # too short for a trigram: scan the unique names (not the rows)
+            codes = [i for i, name in enumerate(self.names) if query in name]
+            return np.array(codes, dtype=np.int32)
+
+        codes = self.candidates(query)
+        if len(query) == TRIGRAM:
+            return codes  # a single trigram match is exact
+        matches = [query in name for name in self.names[codes]]
+        return codes[np.array(matches, dtype=bool)]
+
+    def ranked(self, query):
+        # codes of the names containing query, best first: the exact match, then the names starting with query,
+        # then the rest (in code order within each group, alphabetical for the names of the wage store)
+        codes = self.search(query)
+        names = self.names[codes]
+        rank = np.array(
+            [0 if name == query else 1 if name.startswith(query) else 2 for name in names], dtype=np.int8
+        )
+        return codes[np.lexsort((codes, rank))]
+
+
+def allowed_edits(token):
+    # typos tolerated in a query token: none in initials and very short tokens, 2 in long ones
+    if len(token) <= 2:
+        return 0
+    return 1 if len(token) <= 5 else 2
+
+
+def deletes(token):
+    # the token and every string made by deleting one of its characters
+    return {token} | {token[:i] + token[i + 1 :] for i in range(len(token))}
+
+
+def delete_key(delete):
+    # int64 key of a delete. unlike hash() of a str it is the same in every process, so a saved index stays
+    # valid (see wages/snapshot.py)
+    return int.from_bytes(hashlib.blake2b(delete.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+def edit_distance(a, b, limit):
+    # optimal string alignment distance (insertions, deletions, substitutions and adjacent transpositions),
+    # limit + 1 if it is larger than limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1])
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    def __init__(self, names):
+        self.names = np.asarray(names, dtype=object)
+
+        # token -> codes of the names containing it (CSR like TrigramIndex)
+        joined = " ".join(self.names)
+        tokens = joined.split()
+        if " ".join(tokens) == joined:
+            # names are tokens separated by single spaces (the build normalizes them): count the spaces
+            counts = [name.count(" ") + 1 for name in self.names]
+        else:
+            split = [name.split() for name in self.names]
+            tokens = list(itertools.chain.from_iterable(split))
+            counts = [len(name_tokens) for name_tokens in split]
+        token_ids, tokens = pd.factorize(np.array(tokens, dtype=object))
+        self.tokens = pd.Index(tokens)
+        name_codes = np.repeat(np.arange(len(self.names), dtype=np.int32), counts)
+        order = np.lexsort((name_codes, token_ids))
+        token_ids, name_codes = token_ids[order], name_codes[order]
+        keep = np.ones(len(token_ids), dtype=bool)
+        keep[1:] = (token_ids[1:] != token_ids[:-1]) | (name_codes[1:] != name_codes[:-1])
+        self.postings = name_codes[keep]
+        self.offsets = np.searchsorted(token_ids[keep], np.arange(len(self.tokens) + 1))
+        self.token_counts = np.bincount(self.postings, minlength=len(self.names))
+
+        # symmetric deletes: hash of every one-character delete of every token -> token id
+        delete_keys = []
+        delete_tokens = []
+        for token_id, token in enumerate(self.tokens):
+            for delete in deletes(token) if len(token) > 2 else [token]:
+                delete_keys.append(delete_key(delete))
+                delete_tokens.append(token_id)
+        delete_keys = np.array(delete_keys, dtype=np.int64)
+        order = np.argsort(delete_keys, kind="stable")
+        self.delete_keys = delete_keys[order]
+        self.delete_tokens = np.array(delete_tokens, dtype=np.int32)[order]
+
+    def __len__(self):
+        return len(self.names)
+
+    def token_matches(self, token, max_edits, deadline=None):
+        # (ids, edit distances) of the vocabulary tokens within max_edits of token, closest first. past deadline
+        # (time.perf_counter()) the candidates left are not checked
+        token_id = self.tokens.get_indexer([token])[0]
+        if max_edits == 0:
+            if token_id < 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+            return np.array([token_id]), np.array([0])
+
+        keys = np.array([delete_key(delete) for delete in deletes(token)], dtype=np.int64)
+        starts = np.searchsorted(self.delete_keys, keys, side="left")
+        ends = np.searchsorted(self.delete_keys, keys, side="right")
+        candidates = np.unique(
+            np.concatenate([self.delete_tokens[start:end] for start, end in zip(starts, ends)])
+        )
+        if token_id >= 0:
+            # the token itself first: it is found even when the deadline passes right away
+            candidates = np.concatenate([[token_id], candidates[candidates != token_id]])
+        candidates = candidates[:FUZZY_MAX_CANDIDATES]
+        distances = []
+        for i in candidates:
+            if deadline is not None and distances and time.perf_counter() > deadline:
+                break
+            distances.append(edit_distance(token, self.tokens[i], max_edits))
+        candidates = candidates[: len(distances)]
+        distances = np.array(distances, dtype=np.int64)
+        found = distances <= max_edits
+        candidates, distances = candidates[found], distances[found]
+        order = np.argsort(distances, kind="stable")[:FUZZY_MAX_TOKEN_MATCHES]
+        return candidates[order], distances[order]
+
+    def names_of(self, token_ids, distances):
+        # sorted codes of the names containing any of the tokens, with the smallest distance per name
+        lengths = self.offsets[token_ids + 1] - self.offsets[token_ids]
+        rows = np.concatenate(
+            [np.arange(self.offsets[i], self.offsets[i + 1]) for i in token_ids] or [np.empty(0, dtype=np.int64)]
+        )
+        codes = self.postings[rows]
+        cost = np.repeat(distances, lengths)
+        order = np.lexsort((cost, codes))
+        codes, cost = codes[order], cost[order]
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = codes[1:] != codes[:-1]
+        return codes[first], cost[first]
+
+    def search(self, query, limit=200, time_budget=FUZZY_TIME_BUDGET):
+        # codes of the names matching every token of the query (initials are optional), best first: fewest
+        # edits, then fewest name tokens the query did not mention
+        deadline = time.perf_counter() + time_budget
+        tokens = sorted(set(query.split()), key=len, reverse=True)
+        required = [token for token in tokens if len(token) > 1] or tokens
+        initials = [token for token in tokens if token not in required]
+        if not required:
+            return np.empty(0, dtype=np.int32)
+
+        codes = None
+        for token in required:
+            max_edits = allowed_edits(token) if time.perf_counter() < deadline else 0
+            token_codes, token_cost = self.names_of(*self.token_matches(token, max_edits, deadline))
+            if codes is None:
+                codes, cost = token_codes, token_cost
+            else:
+                codes, i, j = np.intersect1d(codes, token_codes, assume_unique=True, return_indices=True)
+                cost = cost[i] + token_cost[j]
+            if len(codes) == 0:
+                return codes
+
+        matched = np.full(len(codes), len(required))
+        for token in initials:
+            has_initial = np.isin(codes, self.names_of(*self.token_matches(token, 0))[0])
+            cost = cost + ~has_initial  # a missing initial counts as one edit
+            matched += has_initial
+        extra_tokens = self.token_counts[codes] - matched
+
+        order = np.lexsort((codes, extra_tokens, cost))[:limit]
+        return codes[order]
@@ -0,0 +1,164 @@
+# startup snapshot of the structures derived from the salary tables
+#
+# the tables themselves are memory-mapped (see wages/store.py), but the search indexes and the query engine's
+# row indexes/summaries were derived from them again at every start, which takes seconds at millions of rows
+# (and happens in every worker without preload, see gunicorn.conf.py). the snapshot keeps them on disk:
+#   snapshot.pickle        header (version, key, code, buffer offsets) + the objects pickled with protocol 5, whose
+#                          numpy arrays are written out-of-band
+#   snapshot-<key>.buffers the array buffers, 64-byte aligned. they are memory-mapped on load and the arrays
+#                          are read-only views of the mapped file: one read of the small pickle and no copy of
+#                          the arrays (the page cache shares them between processes)
+# the key is the hash of the data the tables were loaded from (store.source_hash: the wage store's manifest
+# with the hashes of its inputs, or the parquet files), so new data or a rebuilt store makes the snapshot
+# stale and it is rebuilt and saved again on the next start. so does a change to the code of the snapshotted
+# objects: the header also holds the hash of the source of CODE_MODULES and the numpy/pandas versions
+# (code_fingerprint). SNAPSHOT_VERSION is for changes to the file format itself
+#
+# objects the tables already hold (the name categories) are not written: they are pickled as references
+# (persistent ids) and the loader hands in the table's own objects, so they are not duplicated in memory (nor
+# the hash tables pandas builds for lookups in them)
+#
+# not snapshotted: the rest of the startup work is cheap. the option lists are the unique job titles (under a
+# millisecond), and the figure templates are built when a figure is reset, not at import
+#
+# UCMW_SNAPSHOT: "on" (default) or "off" (build everything in memory, nothing is read or written)
+# UCMW_SNAPSHOT_DIR: directory of the snapshot (default: snapshot/ in the wage store directory, which is kept
+# outside the served assets, see wages/store.py)
+import hashlib
+import importlib.util
+import io
+import mmap
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from wages import store
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT = os.environ.get("UCMW_SNAPSHOT", "on")
+SNAPSHOT_PATH = os.environ.get("UCMW_SNAPSHOT_DIR", os.path.join(store.STORE_PATH, "snapshot"))
+ALIGNMENT = 64
+# modules of the classes in the snapshot and of the code that builds them (see pages/dashboard.py)
+CODE_MODULES = ["wages.index", "wages.query", "wages.schema", "wages.search", "wages.summary"]
+
+
+def code_fingerprint(modules=CODE_MODULES):
+    # hash of the source of the modules and of the versions of the libraries whose objects are pickled
+    h = hashlib.sha256((np.__version__ + " " + pd.__version__).encode())
+    for name in modules:
+        with open(importlib.util.find_spec(name).origin, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, shared, **kwargs):
+        super().__init__(file, **kwargs)
+        self.shared_ids = {id(obj): name for name, obj in shared.items()}
+
+    def persistent_id(self, obj):
+        return self.shared_ids.get(id(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, shared, **kwargs):
+        super().__init__(file, **kwargs)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        return self.shared[pid]
+
+
+class Snapshot:
+    def __init__(self, key, shared=None, directory=SNAPSHOT_PATH, enabled=SNAPSHOT != "off"):
+        # key: store.source_hash() of the tables; shared: {name: object} of the objects the tables hold
+        self.key = key
+        self.code = code_fingerprint()
+        self.shared = shared or {}
+        self.directory = directory
+        self.enabled = enabled
+        self.objects = {}
+        self.built = []
+        if self.enabled:
+            self.objects = self._load() or {}
+
+    def get(self, name, build):
+        # the object saved under name, or build() (saved by the next save())
+        if name not in self.objects:
+            self.objects[name] = build()
+            self.built.append(name)
+        return self.objects[name]
+
+    def save(self):
+        # writes the snapshot if anything had to be built; a snapshot that cannot be written is only reported
+        if not (self.enabled and self.built):
+            return
+        try:
+            self._write()
+        except OSError as e:
+            print("could not write the startup snapshot: " + str(e))
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, "snapshot.pickle"), "rb") as f:
+                header = pickle.load(f)
+                if (header["version"], header["key"], header.get("code")) != (SNAPSHOT_VERSION, self.key, self.code):
+                    return None
+                payload = f.read()
+            views = []
+            if header["size"]:
+                with open(os.path.join(self.directory, header["buffers"]), "rb") as f:
+                    mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                views = [mapped[start : start + length] for start, length in header["offsets"]]
+            return _Unpickler(io.BytesIO(payload), self.shared, buffers=views).load()
+        except (OSError, EOFError, AttributeError, ImportError, KeyError, TypeError, ValueError, pickle.UnpicklingError):
+            # a snapshot that cannot be read is rebuilt
+            return None
+
+    def _write(self):
+        buffers = []
+        payload = io.BytesIO()
+        _Pickler(payload, self.shared, protocol=5, buffer_callback=buffers.append).dump(self.objects)
+
+        os.makedirs(self.directory, exist_ok=True)
+        # named after the key and the code: processes that write the snapshot at the same time write the same
+        # content
+        buffers_name = "snapshot-" + self.key[:16] + self.code[:16] + ".buffers"
+        offsets = []
+        position = 0
+        with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as f:
+            for buffer in buffers:
+                raw = buffer.raw()
+                f.write(b"\0" * (-position % ALIGNMENT))
+                position += -position % ALIGNMENT
+                offsets.append((position, raw.nbytes))
+                f.write(raw)
+                position += raw.nbytes
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, os.path.join(self.directory, buffers_name))
+
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "key": self.key,
+            "code": self.code,
+            "buffers": buffers_name,
+            "size": position,
+            "offsets": offsets,
+        }
+        # the pickle is replaced last: a reader sees the old snapshot or the complete new one
+        with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as f:
+            pickle.dump(header, f, protocol=5)
+            f.write(payload.getbuffer())
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, os.path.join(self.directory, "snapshot.pickle"))
+
+        # buffers of snapshots of other data (processes that mapped them keep their pages until they exit)
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".buffers") and entry.name != buffers_name:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
@@ -0,0 +1,106 @@
+# loading of the salary tables used by the dashboard
+#
+# the tables are read from the wage store compiled by `python -m wages.build` (see wages/build.py).
+# the store is a set of uncompressed Arrow IPC files that are memory-mapped: nothing is decoded at import,
+# the numeric columns point straight into the mapped files (the OS page cache shares those pages across
+# gunicorn workers) and the columns already have their final dtypes, so no fix-ups happen at runtime
+#
+# UCMW_STORAGE selects where the tables come from:
+#   "auto" (default): the wage store if it has been built, otherwise the parquet files
+#   "store": the wage store
+#   "parquet": decode salaries_by_*.parquet and compile them in memory (every process holds a private copy)
+#
+# the store is kept outside assets/, which Dash serves to anyone: <repo>/wage_store, or wage_store/ in the data
+# folder when UCMW_DATA_DIR is set (UCMW_STORE_DIR overrides both). the startup snapshot goes in the store
+# directory too (see wages/snapshot.py)
+import hashlib
+import json
+import os, pathlib
+
+import pyarrow.feather as feather
+
+APP_PATH = os.path.split(str(pathlib.Path(__file__).parent.resolve()))[0]
+DATA_PATH = os.environ.get("UCMW_DATA_DIR", os.path.join(APP_PATH, "assets"))
+STORE_PATH = os.environ.get(
+    "UCMW_STORE_DIR",
+    os.path.join(DATA_PATH if "UCMW_DATA_DIR" in os.environ else APP_PATH, "wage_store"),
+)
+# where the store used to be built, inside the served assets
+OLD_STORE_PATH = os.path.join(APP_PATH, "assets", "wage_store")
+STORAGE = os.environ.get("UCMW_STORAGE", "auto")
+
+JOB_DATA_PATH = os.path.join(DATA_PATH, "salaries_by_job.parquet")
+NAME_DATA_PATH = os.path.join(DATA_PATH, "salaries_by_name.parquet")
+
+
+def store_exists(store_path=STORE_PATH):
+    # the manifest is written last by the build, so its presence marks a complete store
+    return os.path.exists(os.path.join(store_path, "manifest.json"))
+
+
+def check_version(store_path=STORE_PATH):
+    from wages import build
+
+    with open(os.path.join(store_path, "manifest.json")) as f:
+        version = json.load(f).get("version")
+    if version != build.STORE_VERSION:
+        raise ValueError(
+            "wage store {} has version {}, expected {}: rebuild it with python -m wages.build".format(
+                store_path, version, build.STORE_VERSION
+            )
+        )
+
+
+def read_table(name, store_path=STORE_PATH):
+    # memory_map=True + an uncompressed file means the arrow buffers are views of the mapped pages;
+    # split_blocks=True stops pandas from consolidating (copying) the numeric columns into one block
+    table = feather.read_table(os.path.join(store_path, name + ".arrow"), memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def resolve_storage(storage=STORAGE):
+    if storage == "auto":
+        if store_exists():
+            return "store"
+        if store_exists(OLD_STORE_PATH):
+            print(
+                "not reading the wage store in {} (assets are served publicly): move it to {} or rebuild it".format(
+                    OLD_STORE_PATH, STORE_PATH
+                )
+            )
+        return "parquet"
+    return storage
+
+
+def source_hash(storage=STORAGE):
+    # identifies the data load_tables(storage) returns: the wage store's manifest (which records the hashes
+    # of its inputs and the store version) or the parquet files
+    from wages import build
+
+    storage = resolve_storage(storage)
+    h = hashlib.sha256(storage.encode())
+    if storage == "store":
+        with open(os.path.join(STORE_PATH, "manifest.json"), "rb") as f:
+            h.update(f.read())
+    else:
+        h.update(str(build.STORE_VERSION).encode())
+        for path in [JOB_DATA_PATH, NAME_DATA_PATH]:
+            h.update(build.file_hash(path).encode())
+    return h.hexdigest()
+
+
+def load_tables(storage=STORAGE):
+    # returns df_jobs, df_names
+    storage = resolve_storage(storage)
+
+    if storage == "store":
+        check_version()
+        return read_table("jobs"), read_table("names")
+    elif storage == "parquet":
+        from wages import build
+
+        df_jobs = build.compile_table(build.read_source(JOB_DATA_PATH), sort_names=False)
+        df_names = build.compile_table(build.read_source(NAME_DATA_PATH))
+        return df_jobs, df_names
+    else:
+        raise ValueError("unknown UCMW_STORAGE: " + str(storage))
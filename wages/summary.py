@@ -0,0 +1,60 @@
+# per-name summary of a wage table, built once at load time
+#
+# one entry per name code of the table (numpy arrays indexed by code):
+#   all_years            uint16 bitmask of the years the name has a row in (bit y - MIN_YEAR)
+#   years[pay column]    uint16 bitmask of the years the name has a plotted row in (bit y - MIN_YEAR). a row
+#                        that adds up several source rows to 0 is not plotted (see wages/query.py), and whether
+#                        it adds up to 0 depends on the pay column, hence one mask per pay column
+# so "which years does this name have" and "is this name in both min_year and max_year" are bit operations
+# instead of scans of the table
+import functools
+
+import numpy as np
+
+from wages.schema import DataSchema, MIN_YEAR, PAY_COLUMNS
+
+YEAR_BITS = 16
+
+
+def year_bits(*years):
+    # bitmask with the bits of the given years set
+    mask = 0
+    for year in years:
+        mask |= 1 << (int(year) - MIN_YEAR)
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def years_from_mask(mask):
+    # the years of a bitmask, ascending
+    return tuple(MIN_YEAR + bit for bit in range(YEAR_BITS) if (int(mask) >> bit) & 1)
+
+
+class WageSummary:
+    def __init__(self, df, index):
+        # df sorted by name code (the wage store's order), index its RowRangeIndex
+        years = df[DataSchema.YEAR].to_numpy()
+        if len(years) and (years.min() < MIN_YEAR or years.max() >= MIN_YEAR + YEAR_BITS):
+            raise ValueError("WageSummary covers the years {}-{}".format(MIN_YEAR, MIN_YEAR + YEAR_BITS - 1))
+        source_rows = df[DataSchema.SOURCE_ROWS].to_numpy()
+
+        # reduceat needs non-empty segments: reduce over the names with rows, the others keep 0 (no years)
+        starts = index.offsets[:-1]
+        present = np.flatnonzero(index.offsets[1:] > starts)
+        starts = starts[present]
+        count = len(index)
+
+        self.all_years = np.zeros(count, dtype=np.uint16)
+        self.years = {}
+        bits = (np.uint16(1) << (years - MIN_YEAR).astype(np.uint16)).astype(np.uint16)
+        if len(starts):
+            self.all_years[present] = np.bitwise_or.reduceat(bits, starts)
+        for column in PAY_COLUMNS:
+            pay = df[column].to_numpy()
+            plotted = (source_rows == 1) | (pay != 0)
+            self.years[column] = np.zeros(count, dtype=np.uint16)
+            if len(starts):
+                self.years[column][present] = np.bitwise_or.reduceat(np.where(plotted, bits, 0), starts)
+
+    def __len__(self):
+        return len(self.all_years)